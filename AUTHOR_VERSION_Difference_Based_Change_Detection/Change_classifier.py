@@ -1,32 +1,37 @@
 from PIL import Image
 import numpy as np
+import pandas as pd
 import os, sys
+from Year_stack_cube import Get_year_stack_cube
+from Georeferenced_raster import Save_raster
+from Difference_change_detection import Get_year_pairs, Detect_difference_changes
 
 districts = ['Bangalore', 'Chennai', 'Delhi', 'Gurgaon', 'Hyderabad', 'Kolkata', 'Mumbai']
 main_input_folder = 'BU_NBU_maps'
+years = ['2016', '2017', '2018', '2019']
+# pairs of years compared for the year-over-year change maps: 'consecutive', 'first' (first year vs each later year), or 'all'
+year_pair_mode = 'consecutive'
 
 destination_directory = 'CBU_CNBU_Changing_Maps'
+year_pairs_directory = destination_directory+'/Year_pairs'
 
 for district in districts:
-    input_file_path = main_input_folder+'/'+district
-    image_2016_path = input_file_path+'/'+district+'_BU_NBU_2016.png'
-    image_2019_path = input_file_path+'/'+district+'_BU_NBU_2019.png'
+    print(district)
+    # the maps of all years are read from the memory-mapped cube of the district
+    cube, cube_years, geotransform = Get_year_stack_cube(district, years, main_input_folder)
 
-    image_2016 = np.array( Image.open(image_2016_path) )
-    image_2019 = np.array( Image.open(image_2019_path) )
+    # the change map of 2016 vs 2019 is used by the later stages, the other pairs are saved separately
+    year_pairs = [('2016', '2019')] + [ year_pair for year_pair in Get_year_pairs(years, year_pair_mode) if year_pair != ('2016', '2019') ]
+    change_maps, change_counts = Detect_difference_changes(cube, cube_years, year_pairs)
 
-    image_changing = np.array( Image.open(image_2016_path) ) #initializing with base image
-
-    for i in range(image_2016.shape[0]):
-        for j in range(image_2016.shape[1]):
-            if image_2016[i][j] == 130 and image_2019[i][j] == 65:
-                image_changing[i][j] = 195
-            else:
-                image_changing[i][j] = image_2016[i][j]                  
-
-    image_changing = Image.fromarray(image_changing)
-    
     os.makedirs( destination_directory, exist_ok = True )
-    image_changing.save(destination_directory+'/'+district+'_CBU_CNBU_Changing.png')
+    Image.fromarray(change_maps[0]).save(destination_directory+'/'+district+'_CBU_CNBU_Changing.png')
+    # the map is also saved as a raster, so that the urban extent reads the windows of the map without decoding the png image
+    Save_raster(destination_directory+'/'+district+'_CBU_CNBU_Changing.npy', change_maps[0], geotransform)
+
+    os.makedirs( year_pairs_directory, exist_ok = True )
+    for (first_year, second_year), change_map in zip(year_pairs, change_maps):
+        Image.fromarray(change_map).save(year_pairs_directory+'/'+district+'_CBU_CNBU_Changing_'+first_year+'_'+second_year+'.png')
+    pd.DataFrame(change_counts).to_csv(year_pairs_directory+'/'+district+'_CBU_CNBU_Changing_counts.csv', index=False)
 
 print("Conversion Successful !!")
@@ -8,8 +8,8 @@
 
 import numpy as np
 import pandas as pd 
-from PIL import Image
 import os, sys
+from Georeferenced_raster import Load_raster
 
 
 '''
@@ -27,20 +27,12 @@ def Find_percentage_U_PU_R_pixels(districts, year):
 
     for district in districts:
         # print('Processing ',district,' in year ',year)
-        U_PU_R_imagepath = 'Visualization_Results/U_PU_R_maps/'+district+'/'+district+'_U_PU_R_colored_prediction_'+year+'.png'
-        U_PU_R_map = np.array( Image.open(U_PU_R_imagepath).convert("RGB") )
-        
-        u_count = 0
-        pu_count = 0
-        r_count = 0
-        for i in range(U_PU_R_map.shape[0]):
-            for j in range(U_PU_R_map.shape[1]):
-                if (U_PU_R_map[i][j] == np.array([150, 40, 27])).all() == True:
-                    u_count += 1
-                elif (U_PU_R_map[i][j] == np.array([255, 140, 0])).all() == True:
-                    pu_count += 1
-                elif (U_PU_R_map[i][j] == np.array([255, 255, 255])).all() == True:
-                    r_count += 1
+        # the number of pixels of each label is saved by Generate_grid_urban_parameters.py
+        pixel_counts_dataframe = pd.read_csv('U_PU_R_label_rasters/'+district+'/'+district+'_U_PU_R_pixel_counts.csv', dtype={'Year': str})
+        year_pixel_counts = pixel_counts_dataframe[ pixel_counts_dataframe['Year'] == year ].iloc[0]
+        u_count = int(year_pixel_counts['Urban_pixels'])
+        pu_count = int(year_pixel_counts['Periurban_pixels'])
+        r_count = int(year_pixel_counts['Rural_pixels'])
                 
         total_count = u_count + pu_count + r_count
 
@@ -117,18 +109,12 @@ Input:
 def Compute_Rural_To_Urban_Grids(districts):
     for district in districts:
         print('Processing ',district)
-        imagepath_2016 = 'Visualization_Results/U_PU_R_maps/'+district+'/'+district+'_U_PU_R_colored_prediction_2016.png'
-        imagepath_2019 = 'Visualization_Results/U_PU_R_maps/'+district+'/'+district+'_U_PU_R_colored_prediction_2019.png'
-        
-        map_2016 = np.array( Image.open(imagepath_2016).convert("RGB") )
-        map_2019 = np.array( Image.open(imagepath_2019).convert("RGB") )
+        # the U_PU_R maps are saved as rasters by Generate_grid_urban_parameters.py. Background (0), Urban (1), Peri-urban (2), Rural (3)
+        map_2016, geotransform = Load_raster('U_PU_R_label_rasters/'+district+'/'+district+'_U_PU_R_2016.npy')
+        map_2019, geotransform = Load_raster('U_PU_R_label_rasters/'+district+'/'+district+'_U_PU_R_2019.npy')
         
-        transition_count = 0
-        for i in range(map_2016.shape[0]):
-            for j in range(map_2016.shape[1]):
-                if (map_2016[i][j] == np.array([255, 255, 255])).all() == True:
-                    if (map_2019[i][j] == np.array([255, 255, 255])).all() == False and (map_2019[i][j] == np.array([0, 0, 0])).all() == False:
-                        transition_count += 1
+        # rural pixels of 2016 which are urban or peri-urban in 2019
+        transition_count = int( np.count_nonzero( (map_2016 == 3) & ((map_2019 == 1) | (map_2019 == 2)) ) )
         print("Number of rural to urbanized pixels are: ",transition_count)
 
 
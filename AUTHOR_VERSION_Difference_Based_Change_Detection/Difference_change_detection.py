@@ -0,0 +1,75 @@
+import numpy as np
+
+
+'''
+In the difference based change detection, the BU/NBU maps of two years are compared pixel by pixel.
+A pixel which is NBU (130) in the first year and BU (65) in the second year is Changing (195), and every other pixel keeps
+its label of the first year, i.e. 0 for background, 65 for CBU and 130 for CNBU.
+The functions below compare whole images at once for any number of pairs of years from the cube of a district.
+'''
+changing_label = 195
+
+
+'''
+This function returns the pairs of years to be compared
+Inputs:
+1) years = list of years in increasing order
+2) pair_mode = 'consecutive' compares each year with the next one, 'first' compares the first year with each later year,
+and 'all' compares every year with each later year
+Output:
+1) year_pairs = list of (first year, second year) tuples
+'''
+def Get_year_pairs(years, pair_mode='first'):
+    years = [str(year) for year in years]
+    if pair_mode == 'consecutive':
+        return list( zip(years[:-1], years[1:]) )
+    if pair_mode == 'first':
+        return [ (years[0], later_year) for later_year in years[1:] ]
+    if pair_mode == 'all':
+        return [ (years[i], later_year) for i in range(len(years)) for later_year in years[i+1:] ]
+    raise ValueError("pair_mode should be 'consecutive', 'first' or 'all', not "+str(pair_mode))
+
+
+'''
+This function creates the CBU/CNBU/Changing maps of a district for a list of pairs of years.
+The BU and NBU pixels of each year in the pairs are found only once and shared by all the pairs using that year.
+Inputs:
+1) cube = BU/NBU maps of the district (years x rows x columns) with 0 for background, 65 for BU, and 130 for NBU
+2) cube_years = list of years in the order of the slices of the cube
+3) year_pairs = list of (first year, second year) tuples to be compared
+Output:
+1) change_maps = uint8 array (pairs x rows x columns) with the CBU/CNBU/Changing map of each pair
+2) change_counts = list with a dictionary of the number of CBU, CNBU and Changing pixels for each pair
+'''
+def Detect_difference_changes(cube, cube_years, year_pairs):
+    cube_years = [str(year) for year in cube_years]
+    first_year_indices = [ cube_years.index(str(first_year)) for first_year, second_year in year_pairs ]
+    second_year_indices = [ cube_years.index(str(second_year)) for first_year, second_year in year_pairs ]
+
+    # each year of the cube which is used in any pair is read once
+    used_year_indices = sorted( set(first_year_indices) | set(second_year_indices) )
+    used_images = np.asarray(cube[used_year_indices])
+    position = { year_index: i for i, year_index in enumerate(used_year_indices) }
+    first_positions = [ position[year_index] for year_index in first_year_indices ]
+    second_positions = [ position[year_index] for year_index in second_year_indices ]
+
+    first_year_images = used_images[first_positions]
+    changing_pixels = (first_year_images == 130) & (used_images[second_positions] == 65)
+    change_maps = np.where(changing_pixels, np.uint8(changing_label), first_year_images).astype(np.uint8)
+
+    BU_pixel_counts = np.count_nonzero(used_images == 65, axis=(1,2))
+    NBU_pixel_counts = np.count_nonzero(used_images == 130, axis=(1,2))
+    Changing_pixel_counts = np.count_nonzero(changing_pixels, axis=(1,2))
+
+    change_counts = []
+    for pair_index, (first_year, second_year) in enumerate(year_pairs):
+        first_position = first_positions[pair_index]
+        Changing_pixel_count = int(Changing_pixel_counts[pair_index])
+        change_counts.append({
+            "first_year": str(first_year),
+            "second_year": str(second_year),
+            "CBU": int(BU_pixel_counts[first_position]),
+            "CNBU": int(NBU_pixel_counts[first_position]) - Changing_pixel_count,
+            "Changing": Changing_pixel_count,
+        })
+    return change_maps, change_counts
@@ -9,29 +9,60 @@
 from PIL import Image
 import numpy as np
 import pandas as pd
-from math import radians, cos, sin, asin, sqrt, floor, ceil
-import os, sys
+from math import floor, ceil
+import os, sys, shutil
+from Georeferenced_raster import Get_padding, Get_padded_shape, Get_padded_geotransform, Pad_raster, Save_raster, Load_raster
+from Year_stack_cube import Get_district_geotransform
+from Map_rendering import U_PU_R_legend, Save_rendered_map
+from Grid_aggregation import unit_grid_size, Get_cell_pixel_edges, Count_cell_labels, Get_label_summed_area_table, Count_grid_labels_in_summed_area_table
+from Urban_extent import WDC_radius, urban_threshold, periurban_threshold, Get_ellipse_axes, Sweep_urban_extent, Get_latitude_bands, Sweep_urban_extent_in_latitude_bands
+from Tiled_urban_extent import Sweep_urban_extent_in_tiles
+from Geodesy import Get_haversine_distance
+
+
+'''
+This function returns the lookup tables which convert the values of a CBU/CNBU/Changing map into the BU_NBU labels of
+the first year and the last year under change analysis. Each table holds the label of all 256 values, so a map (or a window of it
+read from disk) is converted with a single look-up. The values other than CBU, CNBU and Changing are kept as they are.
+In the CBU_CNBU_Changing maps, Background is stored as 0, CBU as 65, CNBU as 130, and Changing as 195
+'''
+def Get_BU_NBU_lookup_tables():
+    BU_NBU_first_year_table = np.arange(256, dtype=np.uint8)
+    BU_NBU_first_year_table[65] = 1 # CBU is BU in both years
+    BU_NBU_first_year_table[130] = 2 # CNBU is NBU in both years
+    BU_NBU_first_year_table[195] = 2 # Changing is NBU in first year
+
+    BU_NBU_last_year_table = np.arange(256, dtype=np.uint8)
+    BU_NBU_last_year_table[65] = 1 # CBU is BU in both years
+    BU_NBU_last_year_table[130] = 2 # CNBU is NBU in both years
+    BU_NBU_last_year_table[195] = 1 # Changing is BU in last year
+
+    return BU_NBU_first_year_table, BU_NBU_last_year_table
 
 
 '''
 This function converts the CBU/CNBU/Changing map of a district into BU_NBU maps of 
 a first year and the last year under change analysis.
-In the CBU_CNBU_Changing maps, Background is stored as 0, CBU as 65, CNBU as 130, and Changing as 195
 Output:
 The BU_NBU maps corresponding to the first and last year. Background(0), BU(1), NBU(2)
 '''
 def Get_BU_NBU_maps(CBU_CNBU_Changing_map):
-    BU_NBU_first_year = np.copy(CBU_CNBU_Changing_map) 
-    BU_NBU_first_year[ CBU_CNBU_Changing_map == 65 ] = 1 # CBU is BU in both years
-    BU_NBU_first_year[ CBU_CNBU_Changing_map == 130 ] = 2 # CNBU is NBU in both years
-    BU_NBU_first_year[ CBU_CNBU_Changing_map == 195 ] = 2 # Changing is NBU in first year
-    
-    BU_NBU_last_year = np.copy(CBU_CNBU_Changing_map)
-    BU_NBU_last_year[ CBU_CNBU_Changing_map == 65 ] = 1 # CBU is BU in both years
-    BU_NBU_last_year[ CBU_CNBU_Changing_map == 130 ] = 2 # CNBU is NBU in both years
-    BU_NBU_last_year[ CBU_CNBU_Changing_map == 195 ] = 1 # Changing is BU in last year
-    
-    return BU_NBU_first_year, BU_NBU_last_year
+    BU_NBU_first_year_table, BU_NBU_last_year_table = Get_BU_NBU_lookup_tables()
+    return BU_NBU_first_year_table[CBU_CNBU_Changing_map], BU_NBU_last_year_table[CBU_CNBU_Changing_map]
+
+
+'''
+This function returns the CBU/CNBU/Changing map of a district as a read-only memory-mapped raster, along with its geotransform.
+The change classifier saves the map as a raster next to its png image. A map saved only as a png image (or whose png image is
+newer than its raster) is decoded once here and saved as a raster, so that the later runs read the map from disk without decoding it.
+'''
+def Load_CBU_CNBU_Changing_raster(district, raster_filepath):
+    image_filepath = os.path.splitext(raster_filepath)[0]+'.png'
+    if not os.path.isfile(raster_filepath) or ( os.path.isfile(image_filepath) and os.path.getmtime(image_filepath) > os.path.getmtime(raster_filepath) ):
+        CBU_CNBU_Changing_map = np.array( Image.open(image_filepath) )
+        Save_raster(raster_filepath, CBU_CNBU_Changing_map, Get_district_geotransform('district_coordinates.csv', district, CBU_CNBU_Changing_map.shape))
+        del CBU_CNBU_Changing_map
+    return Load_raster(raster_filepath)
 
 
 '''
@@ -48,223 +79,111 @@ def Get_district_bounding_box( district_coordinates_filepath, district ):
 
 
 '''
-This function pads the image on all 4 sides to accommodate the difference in actual and rounded value
-The padded pixels have the value of background pixels i.e 0
+This function returns the ellipse of the WDC of each latitude band of an image.
+The height of a band is measured along min_lon and its width along the latitude of the middle of the band.
 Inputs:
-1) BU_NBU_map: The BU and NBU mapping of a district for a particular year
-2) min_lat, max_lat, min_lon, max_lon: Original tight bounding box
-3) rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon: Rounded off bounding box
+1) WDC_radius: radius of the WDC in meters
+2) image_shape: (rows, columns) of the image
+3) latitude_bands: list of (row_start, row_stop, band_min_lat, band_max_lat) from Get_latitude_bands
+4) min_lon, max_lon: longitudes of the left and right of the image
+Output:
+1) band_ellipses: tuple of (row_start, row_stop, ellipse_a, ellipse_b) of each band
 '''
-def Pad_image(BU_NBU_map, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon):
-    top_rows = floor( BU_NBU_map.shape[0] * ( (rounded_max_lat - max_lat) / (max_lat - min_lat) ) )
-    bottom_rows = floor( BU_NBU_map.shape[0] * ( (min_lat - rounded_min_lat) / (max_lat - min_lat) ) )
-    left_columns = floor( BU_NBU_map.shape[1] * ( (min_lon - rounded_min_lon) / (max_lon - min_lon) ) )
-    right_columns = floor( BU_NBU_map.shape[1] * ( (rounded_max_lon - max_lon) / (max_lon - min_lon) ) )
-
-    for row in range(top_rows):
-        BU_NBU_map = np.insert(BU_NBU_map, 0, np.zeros( (BU_NBU_map.shape[1],), dtype=int), axis=0)
-    for row in range(bottom_rows):
-        BU_NBU_map = np.insert(BU_NBU_map, len(BU_NBU_map), np.zeros( (BU_NBU_map.shape[1],), dtype=int), axis=0)
-    for column in range(left_columns):
-        BU_NBU_map = np.c_[ np.zeros( (BU_NBU_map.shape[0],), dtype=int ), BU_NBU_map ]
-    for column in range(right_columns):
-        BU_NBU_map = np.c_[ BU_NBU_map, np.zeros( (BU_NBU_map.shape[0],), dtype=int ) ]
+def Get_band_ellipses(WDC_radius, image_shape, latitude_bands, min_lon, max_lon):
+    # the heights and widths of all the bands are measured together
+    band_min_lats = np.array([ band_min_lat for row_start, row_stop, band_min_lat, band_max_lat in latitude_bands ])
+    band_max_lats = np.array([ band_max_lat for row_start, row_stop, band_min_lat, band_max_lat in latitude_bands ])
+    band_middle_lats = (band_min_lats + band_max_lats) / 2.0
+    band_heights = Get_haversine_distance(band_min_lats, min_lon, band_max_lats, min_lon)
+    band_widths = Get_haversine_distance(band_middle_lats, min_lon, band_middle_lats, max_lon)
 
-    return BU_NBU_map
+    band_ellipses = []
+    for (row_start, row_stop, band_min_lat, band_max_lat), band_height, band_width in zip(latitude_bands, band_heights, band_widths):
+        ellipse_a, ellipse_b = Get_ellipse_axes(WDC_radius, (row_stop - row_start, image_shape[1]), band_height, band_width)
+        band_ellipses.append( (row_start, row_stop, ellipse_a, ellipse_b) )
+    return tuple(band_ellipses)
 
 
 '''
-This function is used to find the distance between two coordinates on earth using Haversine formula
+This function returns grid-level urban parameterss 
+Inputs:
+1) U_PU_R_map: Urban/periurban/Rural mapping of a particular district (not rotated). Urban(1), Periurban(2), Rural(3)
+2) min_lat, max_lat, min_lon, max_lon: bounding box coordinates of the district
 '''
-def Get_distance(source_lat, source_lon, dest_lat, dest_lon):
-    # convert all coordinates from degrees to radians
-    source_lat = radians(source_lat)
-    source_lon = radians(source_lon)
-    dest_lat = radians(dest_lat)
-    dest_lon = radians(dest_lon)
-    
-    # Applying Haversine formula
-    difference_lat = dest_lat - source_lat
-    difference_lon = dest_lon - source_lon
-    a = sin(difference_lat/2)**2 + cos(source_lat) * cos(dest_lat) * sin(difference_lon / 2)**2
-    c = 2 * asin(sqrt(a))
-    earth_radius = 6378100.0 # Radius of earth in meters. Use 3956 for miles
-    
-    return c * earth_radius
+def Get_grid_urban_indicators(U_PU_R_map, min_lat, max_lat, min_lon, max_lon):
+    return Get_grid_urban_indicators_of_years([U_PU_R_map], min_lat, max_lat, min_lon, max_lon)[0]
 
 
 '''
-This function re-labels each pixel as rural, peri-urban or urban based on spatial correctness.
-This is based on the percentage of BU pixels within the walking distance circle of a pixel.
+This function returns grid-level urban parameters of several years of a district in one go.
 Inputs:
-1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
-2) min_lat, max_lat, min_lon, max_lon: Bounding box coordinates of the district
+1) U_PU_R_maps: list of Urban/periurban/Rural mappings of the district in different years. Urban(1), Periurban(2), Rural(3)
+2) min_lat, max_lat, min_lon, max_lon: bounding box coordinates of the district
+3) grid_size: size of the grids in degrees
 Output:
-1) Urban_Periurban_Rural_map: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3) 
+1) list with the Results_dataframe of each year
 '''
-def Compute_single_year_urban_extent(BU_NBU_map, min_lat, max_lat, min_lon, max_lon):
-    WDC_radius = 564 # this is radius of walking_distance_circle (WDC) in meters
-    image_rows = BU_NBU_map.shape[0] #These are same for both first and last year
-    image_cols = BU_NBU_map.shape[1] #These are same for both first and last year
-
-    # Since the distribution of pixels about x-axis and y-axis is not same, 
-    # walking_distance_circle will actually be an ellipse in both directions
-
-    # Computing the number of pixels along the radius of major(a) and minor(b) axis of ellipse
-    ellipse_a = floor( (WDC_radius * image_rows) / Get_distance(min_lat, min_lon, max_lat, min_lon) )
-    ellipse_b = floor( (WDC_radius * image_cols) / Get_distance(min_lat, min_lon, min_lat, max_lon) )
-    
-    Urban_Periurban_Rural_map = np.copy(BU_NBU_map)
-    urban_threshold = 0.50 # pixels with more than 50% BU pixels in WDC are urban
-    periurban_threshold = 0.25 # pixels with >=25% and <50% BU pixels in WDC are peri-urban
-    
-    for row_id in range(image_rows):
-        for col_id in range(image_cols):
-            if BU_NBU_map[row_id][col_id] == 0:
-                continue # do no changes to background pixels            
-            BU_pixels_WDC = 0
-            total_pixels_WDC = 0
-            for u in range( row_id-ellipse_a, row_id+ellipse_a +1, 1):
-                for v in range( col_id-ellipse_b, col_id+ellipse_b +1, 1):
-                    if u < 0 or u >= image_rows or v < 0 or v >= image_cols: # if pixel outside bounding box
-                        continue
-                    # if the pixel is within the boundary of ellipse ((x-i)^2 b^2)+((y-j)^2 a^2)-(a^2 b^2) <= 0
-                    if ((u-row_id)**2 * ellipse_b**2) + ((v-col_id)**2 * ellipse_a**2) - (ellipse_a**2 * ellipse_b**2) <= 0:
-                        if BU_NBU_map[u][v] == 1:
-                            BU_pixels_WDC += 1    
-                    total_pixels_WDC += 1
-                    
-            # the calculation of total BU pixels and total pixels in WDC is complete
-            BU_percentage = BU_pixels_WDC / total_pixels_WDC
-            
-            if BU_percentage >= urban_threshold:
-                Urban_Periurban_Rural_map[row_id][col_id] = 1 #pixel is urban
-            elif BU_percentage >= periurban_threshold:
-                Urban_Periurban_Rural_map[row_id][col_id] = 2 #pixel is peri-urban
-            else:
-                Urban_Periurban_Rural_map[row_id][col_id] = 3 #pixel is rural
-                
-    return Urban_Periurban_Rural_map
+def Get_grid_urban_indicators_of_years(U_PU_R_maps, min_lat, max_lat, min_lon, max_lon, grid_size=unit_grid_size):
+    summed_area_tables = Get_U_PU_R_summed_area_tables(U_PU_R_maps, min_lat, max_lat, min_lon, max_lon, [grid_size])
+    return Get_grid_urban_indicators_from_summed_area_tables(summed_area_tables, min_lat, max_lat, min_lon, max_lon, grid_size)
 
 
 '''
-This function re-labels each pixel as rural, peri-urban or urban based on spatial correctness.
-This is based on the percentage of BU pixels within the walking distance circle of a pixel.
+This function returns the number of unit grids (0.01 deg) along the grid rows and the grid columns of a district
+'''
+def Get_unit_grid_counts(min_lat, max_lat, min_lon, max_lon):
+    # value of grid_columns and grid_rows is opposite because the grids are numbered as in the image matrix rotated by 90 deg
+    unit_grid_cols = round( (max_lat - min_lat) * 100.0 )
+    unit_grid_rows = round( (max_lon - min_lon) * 100.0 )
+    return unit_grid_rows, unit_grid_cols
+
+
+'''
+This function builds the summed-area tables of the U_PU_R maps of several years of a district, over the cells of the grids of all the
+given sizes. The pixels of each map are counted in strips of rows, so the maps can be memory-mapped rasters larger than the memory.
 Inputs:
-1) BU_NBU_map1: This is the BU/NBU map of first year with Background (0), BU (1), NBU (2)
-2) BU_NBU_map2: This is the BU/NBU map of last year with Background (0), BU (1), NBU (2)
-3) min_lat, max_lat, min_lon, max_lon: Bounding box coordinates of the district
+1) U_PU_R_maps: list of Urban/periurban/Rural mappings of the district in different years (not rotated). Urban(1), Periurban(2), Rural(3)
+2) min_lat, max_lat, min_lon, max_lon: bounding box coordinates of the district
+3) grid_sizes: sizes of the grids in degrees which are counted from the tables
 Output:
-1) Urban_Periurban_Rural_map1, Urban_Periurban_Rural_map2: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3) 
+1) summed_area_tables: list of the summed-area tables of each year
 '''
-def Compute_urban_extent(BU_NBU_map1, BU_NBU_map2, min_lat, max_lat, min_lon, max_lon):
-    WDC_radius = 564 # this is radius of walking_distance_circle (WDC) in meters
-    image_rows = BU_NBU_map1.shape[0] #These are same for both first and last year
-    image_cols = BU_NBU_map1.shape[1] #These are same for both first and last year
-
-    # Since the distribution of pixels about x-axis and y-axis is not same, 
-    # walking_distance_circle will actually be an ellipse in both directions
-
-    # Computing the number of pixels along the radius of major(a) and minor(b) axis of ellipse
-    ellipse_a = floor( (WDC_radius * image_rows) / Get_distance(min_lat, min_lon, max_lat, min_lon) )
-    ellipse_b = floor( (WDC_radius * image_cols) / Get_distance(min_lat, min_lon, min_lat, max_lon) )
-    
-    Urban_Periurban_Rural_map1 = np.copy(BU_NBU_map1)
-    Urban_Periurban_Rural_map2 = np.copy(BU_NBU_map2)
-    urban_threshold = 0.50 # pixels with more than 50% BU pixels in WDC are urban
-    periurban_threshold = 0.25 # pixels with >=25% and <50% BU pixels in WDC are peri-urban
-    
-    for row_id in range(image_rows):
-        for col_id in range(image_cols):
-            if BU_NBU_map1[row_id][col_id] == 0 and BU_NBU_map2[row_id][col_id] == 0:
-                continue # do no changes to background pixels            
-            
-            BU_pixels_WDC1 = 0
-            total_pixels_WDC1 = 0
-            BU_pixels_WDC2 = 0
-            total_pixels_WDC2 = 0
-            
-            for u in range( row_id-ellipse_a, row_id+ellipse_a +1, 1):
-                for v in range( col_id-ellipse_b, col_id+ellipse_b +1, 1):
-                    if u < 0 or u >= image_rows or v < 0 or v >= image_cols: # if pixel outside bounding box
-                        continue
-                    # if the pixel is within the boundary of ellipse ((x-i)^2 b^2)+((y-j)^2 a^2)-(a^2 b^2) <= 0
-                    if ((u-row_id)**2 * ellipse_b**2) + ((v-col_id)**2 * ellipse_a**2) - (ellipse_a**2 * ellipse_b**2) <= 0:
-                        if BU_NBU_map1[u][v] == 1:
-                            BU_pixels_WDC1 += 1
-                        if BU_NBU_map2[u][v] == 1:
-                            BU_pixels_WDC2 += 1
-                    
-                    total_pixels_WDC1 += 1
-                    total_pixels_WDC2 += 1
-                    
-            # calculate the percentage of BU pixels in the WDC of this pixel
-            BU_percentage1 = BU_pixels_WDC1 / total_pixels_WDC1
-            BU_percentage2 = BU_pixels_WDC2 / total_pixels_WDC2
-            
-            if BU_percentage1 >= urban_threshold:
-                Urban_Periurban_Rural_map1[row_id][col_id] = 1 #pixel is urban
-            elif BU_percentage1 >= periurban_threshold:
-                Urban_Periurban_Rural_map1[row_id][col_id] = 2 #pixel is peri-urban
-            else:
-                Urban_Periurban_Rural_map1[row_id][col_id] = 3 #pixel is rural
-                
-            if BU_percentage2 >= urban_threshold:
-                Urban_Periurban_Rural_map2[row_id][col_id] = 1 #pixel is urban
-            elif BU_percentage2 >= periurban_threshold:
-                Urban_Periurban_Rural_map2[row_id][col_id] = 2 #pixel is peri-urban
-            else:
-                Urban_Periurban_Rural_map2[row_id][col_id] = 3 #pixel is rural
-                
-    return Urban_Periurban_Rural_map1, Urban_Periurban_Rural_map2
-
+def Get_U_PU_R_summed_area_tables(U_PU_R_maps, min_lat, max_lat, min_lon, max_lon, grid_sizes):
+    unit_grid_rows, unit_grid_cols = Get_unit_grid_counts(min_lat, max_lat, min_lon, max_lon)
+    row_edges = Get_cell_pixel_edges(U_PU_R_maps[0].shape[1], unit_grid_rows, grid_sizes)
+    col_edges = Get_cell_pixel_edges(U_PU_R_maps[0].shape[0], unit_grid_cols, grid_sizes)
+    return [ Get_label_summed_area_table( Count_cell_labels(U_PU_R_map, row_edges, col_edges, number_of_labels=4), row_edges, col_edges ) for U_PU_R_map in U_PU_R_maps ]
 
 
 '''
-This function returns grid-level urban parameterss 
+This function returns grid-level urban parameters of several years of a district from the summed-area tables of their U_PU_R maps.
+The tables are built once per year, and the grids of any size are counted from them with 4 look-ups per grid.
 Inputs:
-1) U_PU_R_map: Urban/periurban/Rural mapping of a particular district. Urban(1), Periurban(2), Rural(3)
+1) summed_area_tables: list of summed-area tables of the Urban/periurban/Rural mappings of each year, from Get_U_PU_R_summed_area_tables
 2) min_lat, max_lat, min_lon, max_lon: bounding box coordinates of the district
+3) grid_size: size of the grids in degrees
+Output:
+1) list with the Results_dataframe of each year
 '''
-def Get_grid_urban_indicators(U_PU_R_map, min_lat, max_lat, min_lon, max_lon):
-    # create grids of the district of size 0.01 deg. These grids divide image into rows and columns
-    # value of grid_columns and grid_rows is opposite because the image matrix has been rotated
-    grid_cols = round( (max_lat - min_lat) * 100.0 )
-    grid_rows = round( (max_lon - min_lon) * 100.0 )
-    
-    rows = U_PU_R_map.shape[0]
-    cols = U_PU_R_map.shape[1]
-    
-    result_grid_numbers = []
-    result_grid_types = []
-    result_urban_percentages = []
-    result_periurban_percentages = []
-    result_rural_percentages = []
-    
+def Get_grid_urban_indicators_from_summed_area_tables(summed_area_tables, min_lat, max_lat, min_lon, max_lon, grid_size=unit_grid_size):
+    # the image is divided into unit grids of size 0.01 deg, on which the grids of grid_size are laid out
+    unit_grid_rows, unit_grid_cols = Get_unit_grid_counts(min_lat, max_lat, min_lon, max_lon)
+
     grid_selection_threshold = 0.50 # grids with more that 50% urban/periurban grids are selected for further analysis
-    for grid_i in np.arange(0, grid_rows, 1.0):
-        for grid_j in np.arange(0, grid_cols, 1.0):
-            grid_number = round( (grid_i * grid_cols) + grid_j )
-            total_pixels = 0
-            background_pixels = 0
-            urban_pixels = 0
-            periurban_pixels = 0
-            rural_pixels = 0
-            
-            for pixel_i in range( floor((rows*grid_i)/grid_rows), floor( (rows*(grid_i+1.0))/grid_rows), 1 ):
-                for pixel_j in range( floor((cols*grid_j)/grid_cols), floor((cols*(grid_j+1.0))/grid_cols), 1 ):
-                    # for every pixel (pixel_i, pixel_j) within the grid
-                    if (pixel_i >= 0 and pixel_i < rows and pixel_j >= 0 and pixel_j < cols):
-                        total_pixels += 1
-                        if U_PU_R_map[pixel_i][pixel_j] == 0: # background pixel
-                            background_pixels += 1
-                        elif U_PU_R_map[pixel_i][pixel_j] == 1: # urban pixel
-                            urban_pixels += 1
-                        elif U_PU_R_map[pixel_i][pixel_j] == 2: # periurban pixel
-                            periurban_pixels += 1
-                        elif U_PU_R_map[pixel_i][pixel_j] == 3: # rural pixel
-                            rural_pixels += 1
-            
+    Results_dataframes = []
+    for summed_area_table in summed_area_tables:
+        # number of background(0), urban(1), periurban(2), rural(3) and other pixels in each grid, in the order of grid numbers
+        year_label_counts, grid_rows, grid_cols = Count_grid_labels_in_summed_area_table(summed_area_table, unit_grid_rows, unit_grid_cols, grid_size)
+        result_grid_numbers = []
+        result_grid_types = []
+        result_urban_percentages = []
+        result_periurban_percentages = []
+        result_rural_percentages = []
+
+        for grid_number in range(grid_rows * grid_cols):
+            background_pixels, urban_pixels, periurban_pixels, rural_pixels, other_pixels = [int(count) for count in year_label_counts[grid_number]]
+            total_pixels = background_pixels + urban_pixels + periurban_pixels + rural_pixels + other_pixels
+
             percentage_background = round(background_pixels/total_pixels, 6)
             percentage_urban = round(urban_pixels/total_pixels, 6)
             percentage_periurban = round(periurban_pixels/total_pixels, 6)
@@ -288,103 +207,195 @@ def Get_grid_urban_indicators(U_PU_R_map, min_lat, max_lat, min_lon, max_lon):
             else:
                 result_grid_types.append('Rejected')                     
                     
-    Zipped_results =  list(zip(result_grid_numbers, result_grid_types, result_urban_percentages, result_periurban_percentages, result_rural_percentages))
-    Results_dataframe = pd.DataFrame(Zipped_results, columns = ['Grid_number', 'Grid_type', 'Urban_percentage', 'Periurban_percentage', 'Rural_percentage'])
-    return Results_dataframe
+        Zipped_results =  list(zip(result_grid_numbers, result_grid_types, result_urban_percentages, result_periurban_percentages, result_rural_percentages))
+        Results_dataframe = pd.DataFrame(Zipped_results, columns = ['Grid_number', 'Grid_type', 'Urban_percentage', 'Periurban_percentage', 'Rural_percentage'])
+        Results_dataframes.append(Results_dataframe)
+    return Results_dataframes
+
+
+'''
+This function saves the U_PU_R maps of a district as rasters, along with the number of pixels of each label in each year,
+so that the later stages read them as data instead of decoding the colored images
+Inputs:
+1) district: name of the district
+2) U_PU_R_maps: list of the U_PU_R maps of the years with Background (0), Urban (1), Peri-urban (2), Rural (3)
+3) years: list of the years of the maps
+4) geotransform: geotransform of the padded maps
+Output:
+1) list with the number of Background, Urban, Peri-urban and Rural pixels of each year
+'''
+def Save_U_PU_R_maps(district, U_PU_R_maps, years, geotransform):
+    target_directory = 'U_PU_R_label_rasters/'+district
+    pixel_counts = []
+    for U_PU_R_map, year in zip(U_PU_R_maps, years):
+        Save_raster(target_directory+'/'+district+'_U_PU_R_'+year+'.npy', U_PU_R_map, geotransform)
+        # the whole map is counted as a single cell, in strips of rows
+        label_counts = Count_cell_labels(U_PU_R_map, [0, U_PU_R_map.shape[1]], [0, U_PU_R_map.shape[0]], number_of_labels=4)[0, 0]
+        pixel_counts.append( [district, year] + [ int(label_count) for label_count in label_counts[:4] ] )
+    pixel_counts_dataframe = pd.DataFrame(pixel_counts, columns=['District_name', 'Year', 'Background_pixels', 'Urban_pixels', 'Periurban_pixels', 'Rural_pixels'])
+    pixel_counts_dataframe.to_csv(target_directory+'/'+district+'_U_PU_R_pixel_counts.csv', index=False)
+    return [ year_pixel_counts[2:] for year_pixel_counts in pixel_counts ]
 
 
 '''
 This function plots the visual image of district with Urban/Periurban/Rural mapping
 '''
 def Plot_U_PU_R_map(district, U_PU_R_mapping, year, target_filepath):
-    # RGBA code for each of the label
-    background_color = [0, 0, 0] # black color
-    urban_color = [150, 40, 27] # maroon color
-    periurban_color = [255, 140, 0] # darkorange color
-    rural_color = [255, 255, 255] # white color
-
-    U_PU_R_image = np.zeros([U_PU_R_mapping.shape[0], U_PU_R_mapping.shape[1], 3], dtype=np.uint8)
-    
-    for y in range(U_PU_R_image.shape[1]):
-        for x in range(U_PU_R_image.shape[0]):
-            if U_PU_R_mapping[x][y] == 0:      # background 
-                U_PU_R_image[x][y] = background_color            
-            elif U_PU_R_mapping[x][y] == 1:    # urban pixel
-                U_PU_R_image[x][y] = urban_color      
-            elif U_PU_R_mapping[x][y] == 2:    # peri-urban pixel
-                U_PU_R_image[x][y] = periurban_color      
-            elif U_PU_R_mapping[x][y] == 3:    # rural pixel 
-                U_PU_R_image[x][y] = rural_color  
-            
-    U_PU_R_image = Image.fromarray(U_PU_R_image)
-    U_PU_R_image.save(target_filepath+'/'+district+'_U_PU_R_colored_prediction_'+year+'.png')
+    # the labels are colored with the shared legend of the U_PU_R maps
+    Save_rendered_map(U_PU_R_mapping, U_PU_R_legend, target_filepath+'/'+district+'_U_PU_R_colored_prediction_'+year+'.png')
     #print("Done plotting ",district)
 
 
 '''
 Driver code begins here
 '''
+# WDC radii (in meters) and (urban, peri-urban) thresholds of the sensitivity sweep
+# the default WDC_radius (564 m) and thresholds (0.50, 0.25) are always included, since the later stages use their results
+WDC_radius_sweep = [WDC_radius]
+threshold_sweep = [(urban_threshold, periurban_threshold)]
+WDC_radius_sweep = [WDC_radius] + [ radius for radius in WDC_radius_sweep if radius != WDC_radius ]
+threshold_sweep = [(urban_threshold, periurban_threshold)] + [ thresholds for thresholds in threshold_sweep if thresholds != (urban_threshold, periurban_threshold) ]
+# in the incremental mode, the urban extent of the last year is updated from the first year using only the Changing pixels
+# this is faster when few pixels change between the years (e.g. yearly refreshes), and gives the same results
+incremental_urban_extent = False
+# with a tile size, the urban extent is computed in tiles of this many pixels by number_of_workers processes, with the maps memory-mapped
+# on disk in the folder Urban_extent_tiles, so that large regions fit in memory. None computes the whole district at once in memory
+# the tiles, the latitude bands and the incremental mode are separate ways of computing the urban extent, and only one of them can be set
+urban_extent_tile_size = None
+number_of_workers = None
+# for tall regions, the rows are divided into latitude bands, each with its own ellipse of the WDC. 1 uses a single ellipse for the district
+number_of_latitude_bands = 1
 #print("***** Calculating Urban Indicators at both Pixel and Grid-level ******\n")
+# sizes of the grids (in degrees) of the grid-level urban indicators, e.g. [0.01, 0.005, 0.02, 0.05]
+# the unit grid size (0.01 deg) is always included, since the later stages use its results
+grid_sizes = [unit_grid_size]
+grid_sizes = [unit_grid_size] + [ grid_size for grid_size in grid_sizes if grid_size != unit_grid_size ]
 districts = ['Bangalore','Chennai','Delhi','Gurgaon','Hyderabad','Kolkata','Mumbai']
 #districts = ['Chennai']
 
-for district in districts:
-    print("Working on ", district)
-
-    CBU_CNBU_Chaning_map_filepath = 'CBU_CNBU_Changing_Maps/'+district+'_CBU_CNBU_Changing.png'
-    CBU_CNBU_Changing_map = np.array( Image.open(CBU_CNBU_Chaning_map_filepath) )
-    # print( np.unique(CBU_CNBU_Changing_map, return_counts=True) )
-
-    min_lat, max_lat, min_lon, max_lon = Get_district_bounding_box( 'district_coordinates.csv', district )
-    # Since the grid size (0.01) is of precision 2, round off the image bounding box to fit all the grids
-    rounded_min_lat = floor(100.0 * min_lat) / 100.0
-    rounded_max_lat = ceil(100.0 * max_lat) / 100.0
-    rounded_min_lon = floor(100.0 * min_lon) / 100.0
-    rounded_max_lon = ceil(100.0 * max_lon) / 100.0
-
-    # Pad the image to fill gap between tight bounds and rounded bounds
-    padded_CBU_CNBU_Changing_map = Pad_image(CBU_CNBU_Changing_map, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon)
-
-    # The years under analysis, first_year = 2016, last_year = 2019
-    padded_BU_NBU_first_year, padded_BU_NBU_last_year = Get_BU_NBU_maps(padded_CBU_CNBU_Changing_map)
-    #print("padded first year: ", np.unique(padded_BU_NBU_first_year, return_counts=True) )
-    #print("padded last year: ", np.unique(padded_BU_NBU_last_year, return_counts=True) )
-
-    # find the Urban/Periurban/Rural i.e U_PU_R pixel-level mapping
-    U_PU_R_first_year, U_PU_R_last_year = Compute_urban_extent(padded_BU_NBU_first_year, padded_BU_NBU_last_year, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon)
-    #print('U_PU_R 2016: \t', np.unique(U_PU_R_first_year, return_counts=True) )
-    #print('U_PU_R 2019: \t', np.unique(U_PU_R_last_year, return_counts=True) )
-
-    save_image_directory = 'Visualization_Results/U_PU_R_maps/'+district
-    os.makedirs(save_image_directory, exist_ok = True)
-    Plot_U_PU_R_map(district, U_PU_R_first_year, '2016', save_image_directory)
-    Plot_U_PU_R_map(district, U_PU_R_last_year, '2019', save_image_directory)
-
-    #we rotate the matrix by 90deg in clockwise direction. 
-    #This is done to traverse the matrix by grid number 0---n 
-    #because grids are numbered from bottom left to top in computing road indicators
-    rotated_U_PU_R_first = np.rot90(U_PU_R_first_year, 1, (1,0)) 
-    rotated_U_PU_R_last = np.rot90(U_PU_R_last_year, 1, (1,0))
-    
-    Results_dataframe_first = Get_grid_urban_indicators(rotated_U_PU_R_first, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon)
-    Results_dataframe_last = Get_grid_urban_indicators(rotated_U_PU_R_last, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon)
-
-    Results_dataframe_first.insert(0, "District_name", np.full(len(Results_dataframe_first), district))
-    Results_dataframe_last.insert(0, "District_name", np.full(len(Results_dataframe_last), district))
-    results_directory = "Grid_wise_urban_indicators/"+district
-    os.makedirs(results_directory, exist_ok = True)
-
-    first_year = '2016'
-    last_year = '2019'
-    result_filename_first = district+"_urban_indicators_"+first_year+".csv"
-    result_filename_last = district+"_urban_indicators_"+last_year+".csv"
-
-    Results_dataframe_first.to_csv(results_directory+'/'+result_filename_first, index=False)
-    Results_dataframe_last.to_csv(results_directory+'/'+result_filename_last, index=False)
-
-    print("Spatial indicators for ",district," successfully computed!!\n")
-
-print("\n#### Check Grid_wise_urban_indicators directory for the resultant files & Visualization_Results/U_PU_R_maps for pixel-wise visualizations of urban/perirban/rural maps ####\n")
+if __name__ == '__main__':
+    # the settings are checked before any district is computed, instead of ignoring the settings which cannot be combined
+    if number_of_latitude_bands > 1 and urban_extent_tile_size is not None:
+        raise ValueError("number_of_latitude_bands > 1 computes the urban extent in memory, and cannot be combined with urban_extent_tile_size")
+    if number_of_latitude_bands > 1 and incremental_urban_extent:
+        raise ValueError("number_of_latitude_bands > 1 cannot be combined with incremental_urban_extent")
+    if urban_extent_tile_size is not None and incremental_urban_extent:
+        raise ValueError("incremental_urban_extent is computed in memory, and cannot be combined with urban_extent_tile_size")
+
+    for district in districts:
+        print("Working on ", district)
+
+        # the map is memory-mapped from disk, and only the pixels which are indexed are read
+        CBU_CNBU_Changing_raster_filepath = 'CBU_CNBU_Changing_Maps/'+district+'_CBU_CNBU_Changing.npy'
+        CBU_CNBU_Changing_raster, district_geotransform = Load_CBU_CNBU_Changing_raster(district, CBU_CNBU_Changing_raster_filepath)
+
+        min_lat, max_lat, min_lon, max_lon = Get_district_bounding_box( 'district_coordinates.csv', district )
+        # Since the grid size (0.01) is of precision 2, round off the image bounding box to fit all the grids
+        rounded_min_lat = floor(100.0 * min_lat) / 100.0
+        rounded_max_lat = ceil(100.0 * max_lat) / 100.0
+        rounded_min_lon = floor(100.0 * min_lon) / 100.0
+        rounded_max_lon = ceil(100.0 * max_lon) / 100.0
+
+        # Pad the image to fill gap between tight bounds and rounded bounds
+        # the padding is kept as metadata, from which the padded map and its geotransform are found
+        padding = Get_padding(CBU_CNBU_Changing_raster.shape, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon, rounding=floor)
+        padded_shape = Get_padded_shape(CBU_CNBU_Changing_raster.shape, padding)
+        padded_geotransform = Get_padded_geotransform(district_geotransform, padding)
+
+        # find the Urban/Periurban/Rural i.e U_PU_R pixel-level mapping for each WDC radius and pair of thresholds
+        # the FFTs of the BU pixels of both years are shared by all the radii, and the BU percentages of a radius by all the thresholds
+        district_height, district_width = Get_haversine_distance(rounded_min_lat, rounded_min_lon, [rounded_max_lat, rounded_min_lat], [rounded_min_lon, rounded_max_lon])
+        # radii which give the same ellipse in pixels (or the same ellipses of all latitude bands) are computed only once
+        WDC_radius_of_ellipse = {}
+        if number_of_latitude_bands > 1:
+            latitude_bands = Get_latitude_bands(padded_shape, rounded_min_lat, rounded_max_lat, number_of_latitude_bands)
+        for radius in WDC_radius_sweep:
+            if number_of_latitude_bands > 1:
+                ellipse = Get_band_ellipses(radius, padded_shape, latitude_bands, rounded_min_lon, rounded_max_lon)
+            else:
+                ellipse = Get_ellipse_axes(radius, padded_shape, district_height, district_width)
+            WDC_radius_of_ellipse.setdefault( ellipse, radius )
+        ellipse_axes_list = list(WDC_radius_of_ellipse.keys())
+
+        results_directory = "Grid_wise_urban_indicators/"+district
+        os.makedirs(results_directory, exist_ok = True)
+        first_year = '2016'
+        last_year = '2019'
+
+        tiles_directory = None
+        if urban_extent_tile_size is None:
+            # The years under analysis, first_year = 2016, last_year = 2019
+            # the padded maps of the whole district are built in memory
+            padded_CBU_CNBU_Changing_map = Pad_raster(CBU_CNBU_Changing_raster, padding)
+            padded_BU_NBU_first_year, padded_BU_NBU_last_year = Get_BU_NBU_maps(padded_CBU_CNBU_Changing_map)
+            #print("padded first year: ", np.unique(padded_BU_NBU_first_year, return_counts=True) )
+            #print("padded last year: ", np.unique(padded_BU_NBU_last_year, return_counts=True) )
+
+            if number_of_latitude_bands > 1:
+                urban_extents = Sweep_urban_extent_in_latitude_bands([padded_BU_NBU_first_year, padded_BU_NBU_last_year], ellipse_axes_list, threshold_sweep)
+            else:
+                # the Changing pixels are the only pixels which are NBU in the first year and BU in the last year
+                BU_changes = [ (padded_CBU_CNBU_Changing_map == 195).astype(np.int8) ] if incremental_urban_extent else None
+                urban_extents = Sweep_urban_extent([padded_BU_NBU_first_year, padded_BU_NBU_last_year], ellipse_axes_list, threshold_sweep, BU_changes=BU_changes)
+        else:
+            # the workers read the windows of the padded BU/NBU maps of both years from the CBU/CNBU/Changing raster,
+            # so the padded maps of the district are never built, and the labelled maps are memory-mapped in the folder of the tiles
+            tiles_directory = 'Urban_extent_tiles/'+district
+            BU_NBU_sources = [ (CBU_CNBU_Changing_raster_filepath, padding, BU_NBU_table) for BU_NBU_table in Get_BU_NBU_lookup_tables() ]
+            BU_NBU_names = [ district+'_BU_NBU_'+year for year in [first_year, last_year] ]
+            urban_extents = Sweep_urban_extent_in_tiles(BU_NBU_sources, BU_NBU_names, ellipse_axes_list, threshold_sweep, tiles_directory, urban_extent_tile_size, number_of_workers)
+
+        for ellipse_axes, thresholds, (U_PU_R_first_year, U_PU_R_last_year) in urban_extents:
+            is_default_setting = ( WDC_radius_of_ellipse[ellipse_axes] == WDC_radius and thresholds == (urban_threshold, periurban_threshold) )
+            if is_default_setting:
+                save_image_directory = 'Visualization_Results/U_PU_R_maps/'+district
+                os.makedirs(save_image_directory, exist_ok = True)
+                Plot_U_PU_R_map(district, U_PU_R_first_year, '2016', save_image_directory)
+                Plot_U_PU_R_map(district, U_PU_R_last_year, '2019', save_image_directory)
+                U_PU_R_pixel_counts = Save_U_PU_R_maps(district, [U_PU_R_first_year, U_PU_R_last_year], [first_year, last_year], padded_geotransform)
+                #print('U_PU_R 2016: \t', U_PU_R_pixel_counts[0] )
+                #print('U_PU_R 2019: \t', U_PU_R_pixel_counts[1] )
+
+            # the grids are numbered from bottom left to top, as if the matrix was rotated by 90deg in clockwise direction,
+            # because grids are numbered from bottom left to top in computing road indicators
+            # the summed-area tables of both years are built once and give the grid-level results of every grid size
+            summed_area_tables = Get_U_PU_R_summed_area_tables([U_PU_R_first_year, U_PU_R_last_year], rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon, grid_sizes)
+
+            # the results of the default WDC radius and thresholds are used by the later stages, the others are saved in the WDC_sweep folder
+            if is_default_setting:
+                setting_directory = results_directory
+                setting_name = ""
+            else:
+                setting_directory = results_directory+"/WDC_sweep"
+                setting_name = "_WDC_"+str(WDC_radius_of_ellipse[ellipse_axes])+"m_U"+str(thresholds[0])+"_PU"+str(thresholds[1])
+
+            for grid_size in grid_sizes:
+                Results_dataframe_first, Results_dataframe_last = Get_grid_urban_indicators_from_summed_area_tables(summed_area_tables, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon, grid_size)
+
+                Results_dataframe_first.insert(0, "District_name", np.full(len(Results_dataframe_first), district))
+                Results_dataframe_last.insert(0, "District_name", np.full(len(Results_dataframe_last), district))
+
+                # the results of the other grid sizes are saved in the Grid_sizes folder of the setting
+                if grid_size == unit_grid_size:
+                    grid_size_directory = setting_directory
+                    grid_size_name = ""
+                else:
+                    grid_size_directory = setting_directory+"/Grid_sizes"
+                    grid_size_name = "_grid_"+str(grid_size)
+                os.makedirs(grid_size_directory, exist_ok = True)
+
+                result_filename_first = district+"_urban_indicators_"+first_year+setting_name+grid_size_name+".csv"
+                result_filename_last = district+"_urban_indicators_"+last_year+setting_name+grid_size_name+".csv"
+
+                Results_dataframe_first.to_csv(grid_size_directory+'/'+result_filename_first, index=False)
+                Results_dataframe_last.to_csv(grid_size_directory+'/'+result_filename_last, index=False)
+
+        if tiles_directory is not None:
+            del U_PU_R_first_year, U_PU_R_last_year
+            shutil.rmtree(tiles_directory)
+        print("Spatial indicators for ",district," successfully computed!!\n")
+
+    print("\n#### Check Grid_wise_urban_indicators directory for the resultant files & Visualization_Results/U_PU_R_maps for pixel-wise visualizations of urban/perirban/rural maps ####\n")
 
 
 
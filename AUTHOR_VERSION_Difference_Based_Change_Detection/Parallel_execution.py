@@ -0,0 +1,40 @@
+import os, sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+'''
+The stages of change detection process each district (and each year of a district) independently of the others,
+so the districts are run in a pool of processes. Every task reads its images from the memory-mapped cube of its district
+and writes its results to disk, so no large array is pickled between the processes; only the names of districts and
+years are sent to the workers and only small results (such as thresholds or pixel counts) are sent back.
+Each task does exactly the same computation as in a serial run, so the results are byte-identical.
+'''
+
+
+'''
+This function returns the number of worker processes to be used. None means all the cores of the machine.
+'''
+def Get_number_of_workers(number_of_workers=None):
+    if number_of_workers is None:
+        number_of_workers = os.cpu_count() or 1
+    return max(1, int(number_of_workers))
+
+
+'''
+This function calls a function once for every tuple of arguments in a pool of processes.
+Inputs:
+1) function = function to be called. It should be defined at the top level of a module so that it can be sent to the workers
+2) arguments_list = list of tuples of arguments, one tuple for each call
+3) number_of_workers = number of processes. With 1 worker, the calls are made one after another in this process
+Output:
+1) results = list of the values returned by each call, in the order of arguments_list
+'''
+def Run_in_parallel(function, arguments_list, number_of_workers=None):
+    number_of_workers = min( Get_number_of_workers(number_of_workers), max(1, len(arguments_list)) )
+    if number_of_workers == 1:
+        return [function(*arguments) for arguments in arguments_list]
+
+    with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+        futures = [executor.submit(function, *arguments) for arguments in arguments_list]
+        # result() raises the exception of a failed call in this process
+        return [future.result() for future in futures]
@@ -0,0 +1,364 @@
+from lxml import etree as ET
+import numpy as np
+from collections import namedtuple
+from Geodesy import Get_haversine_distance
+
+
+'''
+The road network of a district is stored as a graph in compressed sparse row (CSR) form instead of maps keyed by the OSM node ids.
+The nodes are numbered 0,1,...,(nodes - 1) in the order in which they are first met in the ways, and
+1) node_ids = OSM id of each node (int64)
+2) node_lats, node_lons = latitude and longitude of each node (float64)
+3) neighbour_offsets = the neighbours of the node k are stored from neighbour_offsets[k] up to neighbour_offsets[k+1]-1 (int64)
+4) neighbours = number of the neighbouring node of every edge (int32). Each undirected edge is stored twice, once from each of its nodes
+5) edge_lengths = length of every edge in meters (float64)
+A subgraph (e.g. of the nodes in a grid) is a graph of the same form with its own node numbers.
+'''
+Road_graph = namedtuple('Road_graph', ['node_ids', 'node_lats', 'node_lons', 'neighbour_offsets', 'neighbours', 'edge_lengths'])
+
+'''
+To find the nodes of a grid without scanning the whole district, the nodes are put in the buckets of a lattice of cells of the grid size.
+The cell of a node is (row, col) = (floor((lat - origin_lat) / cell_size), floor((lon - origin_lon) / cell_size)), and
+1) cell_offsets = the nodes of the cell number (row * cell_cols) + col are stored from cell_offsets[cell] up to cell_offsets[cell+1]-1
+2) cell_nodes = node numbers sorted by their cell
+The cell of a coordinate never decreases as the coordinate grows, so the nodes in a bounding box are all in the cells from the cell of
+its minimum to the cell of its maximum, even for the nodes lying on the boundaries of the grids.
+'''
+Road_cell_index = namedtuple('Road_cell_index', ['origin_lat', 'origin_lon', 'cell_size', 'cell_rows', 'cell_cols', 'cell_offsets', 'cell_nodes'])
+
+
+'''
+This function reads the id and coordinates of all the nodes of an OSM file.
+When a node id is repeated, the coordinates of its first node are kept.
+Output:
+1) node_ids = sorted OSM ids of the nodes
+2) node_lats, node_lons = coordinates of the nodes, with a precision of 7 decimal points
+'''
+def Read_OSM_nodes(osm_filepath):
+    context = ET.iterparse(osm_filepath, events=('end',), tag='node')
+    node_ids = []
+    node_lats = []
+    node_lons = []
+    for event, node in context:
+        node_ids.append( int(node.attrib["id"]) )
+        node_lats.append( float(node.attrib["lat"]) )
+        node_lons.append( float(node.attrib["lon"]) )
+        node.clear()
+
+    node_ids, first_indices = np.unique( np.array(node_ids, dtype=np.int64), return_index=True )
+    return node_ids, np.array(node_lats)[first_indices], np.array(node_lons)[first_indices]
+
+
+'''
+This function reads the road segments of all the ways of an OSM file, i.e. the pairs of consecutive nodes of each way
+Output:
+1) source_ids, dest_ids = OSM ids of the first and second node of each segment, in the order of the ways
+'''
+def Read_OSM_way_segments(osm_filepath):
+    context = ET.iterparse(osm_filepath, events=('end',), tag='way')
+    source_ids = []
+    dest_ids = []
+    for event, ways in context:
+        for i in range(len(ways) - 1):
+            if ways[i].tag == 'nd' and ways[i+1].tag == 'nd':
+                source_ids.append( int(ways[i].attrib["ref"]) )
+                dest_ids.append( int(ways[i+1].attrib["ref"]) )
+        ways.clear()
+    return np.array(source_ids, dtype=np.int64), np.array(dest_ids, dtype=np.int64)
+
+
+'''
+This function builds a graph in CSR form from the directed edges between its nodes.
+Repeated edges are stored once, and the neighbours of each node are kept in the order of their first edge.
+Inputs:
+1) node_ids, node_lats, node_lons = OSM id and coordinates of each node of the graph
+2) edge_sources, edge_dests = numbers of the source and destination nodes of each directed edge
+'''
+def Create_graph_from_edges(node_ids, node_lats, node_lons, edge_sources, edge_dests):
+    number_of_nodes = len(node_ids)
+    edge_keys = edge_sources.astype(np.int64) * number_of_nodes + edge_dests
+    unique_keys, first_indices = np.unique(edge_keys, return_index=True)
+    first_indices = np.sort(first_indices)
+    edge_sources = edge_sources[first_indices]
+    edge_dests = edge_dests[first_indices]
+
+    # a stable sort by the source node keeps the order of the neighbours of each node
+    edge_order = np.argsort(edge_sources, kind='stable')
+    edge_sources = edge_sources[edge_order]
+    neighbours = edge_dests[edge_order].astype(np.int32)
+
+    neighbour_offsets = np.zeros(number_of_nodes + 1, dtype=np.int64)
+    np.cumsum( np.bincount(edge_sources, minlength=number_of_nodes), out=neighbour_offsets[1:] )
+    edge_lengths = Get_haversine_distance(node_lats[edge_sources], node_lons[edge_sources], node_lats[neighbours], node_lons[neighbours])
+    return Road_graph(node_ids, node_lats, node_lons, neighbour_offsets, neighbours, edge_lengths)
+
+
+'''
+This function creates the road graph of a district from its processed OSM data.
+The nodes of the ways which lie within the bounding box of the district (boundaries included) are the nodes of the graph,
+and the edges associated with the nodes outside the bounding box are excluded.
+Inputs:
+1) osm_filepath = path of the file holding the processed OSM data on roads of the district
+2) min_lat, max_lat, min_lon, max_lon = bounding box of the district
+'''
+def Create_road_graph(osm_filepath, min_lat, max_lat, min_lon, max_lon):
+    osm_node_ids, osm_node_lats, osm_node_lons = Read_OSM_nodes(osm_filepath)
+    source_ids, dest_ids = Read_OSM_way_segments(osm_filepath)
+    sources = np.searchsorted(osm_node_ids, source_ids)
+    dests = np.searchsorted(osm_node_ids, dest_ids)
+
+    inside_nodes = (osm_node_lats >= min_lat) & (osm_node_lats <= max_lat) & (osm_node_lons >= min_lon) & (osm_node_lons <= max_lon)
+    inside_sources = inside_nodes[sources]
+    inside_dests = inside_nodes[dests]
+
+    # the nodes are numbered in the order of their first segment
+    segment_nodes = np.column_stack((sources, dests)).reshape(-1)
+    segment_nodes = segment_nodes[ np.column_stack((inside_sources, inside_dests)).reshape(-1) ]
+    unique_nodes, first_indices = np.unique(segment_nodes, return_index=True)
+    graph_nodes = unique_nodes[ np.argsort(first_indices) ]
+    graph_node_numbers = np.full(len(osm_node_ids), -1, dtype=np.int64)
+    graph_node_numbers[graph_nodes] = np.arange(len(graph_nodes))
+
+    # each segment with both nodes inside gives an edge from each of its nodes, in the order of the segments
+    inside_segments = inside_sources & inside_dests
+    segment_sources = graph_node_numbers[ sources[inside_segments] ]
+    segment_dests = graph_node_numbers[ dests[inside_segments] ]
+    edge_sources = np.column_stack((segment_sources, segment_dests)).reshape(-1)
+    edge_dests = np.column_stack((segment_dests, segment_sources)).reshape(-1)
+    return Create_graph_from_edges(osm_node_ids[graph_nodes], osm_node_lats[graph_nodes], osm_node_lons[graph_nodes], edge_sources, edge_dests)
+
+
+'''
+This function returns the number of neighbours of every node of a graph
+'''
+def Get_node_degrees(road_graph):
+    return np.diff(road_graph.neighbour_offsets)
+
+
+'''
+This function returns the edges of the given nodes of a graph
+Inputs:
+1) road_graph = graph in CSR form
+2) nodes = array of node numbers
+Output:
+1) edge_sources = number of the source node of each edge
+2) edge_positions = position of each edge in the neighbours and edge_lengths of the graph
+'''
+def Get_edges_of_nodes(road_graph, nodes):
+    starts = road_graph.neighbour_offsets[nodes]
+    degrees = road_graph.neighbour_offsets[nodes + 1] - starts
+    edge_sources = np.repeat(nodes, degrees)
+    edge_positions = np.arange(degrees.sum()) + np.repeat(starts - (np.cumsum(degrees) - degrees), degrees)
+    return edge_sources, edge_positions
+
+
+'''
+This function returns the cell rows and columns of arrays of coordinates in a cell index
+'''
+def Get_cells_of_coordinates(cell_index, lats, lons):
+    cell_rows = np.floor( (np.asarray(lats, dtype=np.float64) - cell_index.origin_lat) / cell_index.cell_size )
+    cell_cols = np.floor( (np.asarray(lons, dtype=np.float64) - cell_index.origin_lon) / cell_index.cell_size )
+    # the coordinates before the origin are put in the first cells
+    return np.maximum(cell_rows, 0).astype(np.int64), np.maximum(cell_cols, 0).astype(np.int64)
+
+
+'''
+This function puts the nodes of a graph in the buckets of a lattice of cells, in a single pass over the nodes
+Inputs:
+1) road_graph = graph in CSR form
+2) origin_lat, origin_lon = minimum latitude and longitude of the lattice, e.g. of the district bounding box
+3) cell_size = size of the cells in degrees
+'''
+def Create_cell_index(road_graph, origin_lat, origin_lon, cell_size=0.01):
+    cell_index = Road_cell_index(origin_lat, origin_lon, cell_size, 0, 0, None, None)
+    node_cell_rows, node_cell_cols = Get_cells_of_coordinates(cell_index, road_graph.node_lats, road_graph.node_lons)
+    cell_rows = int(node_cell_rows.max()) + 1 if len(node_cell_rows) > 0 else 0
+    cell_cols = int(node_cell_cols.max()) + 1 if len(node_cell_cols) > 0 else 0
+
+    # a stable sort keeps the nodes of each cell in the order of their numbers
+    node_cells = node_cell_rows * cell_cols + node_cell_cols
+    cell_nodes = np.argsort(node_cells, kind='stable').astype(np.int32)
+    cell_offsets = np.zeros(cell_rows * cell_cols + 1, dtype=np.int64)
+    np.cumsum( np.bincount(node_cells, minlength=cell_rows * cell_cols), out=cell_offsets[1:] )
+    return cell_index._replace(cell_rows=cell_rows, cell_cols=cell_cols, cell_offsets=cell_offsets, cell_nodes=cell_nodes)
+
+
+'''
+This function returns the sorted numbers of the nodes in the cells covering a bounding box.
+The nodes of each row of cells are stored together, so they are read with one slice per row of cells
+'''
+def Get_nodes_in_cells(cell_index, min_lat, max_lat, min_lon, max_lon):
+    min_cell_row, min_cell_col = Get_cells_of_coordinates(cell_index, min_lat, min_lon)
+    max_cell_row, max_cell_col = Get_cells_of_coordinates(cell_index, max_lat, max_lon)
+    min_cell_row, min_cell_col = int(min_cell_row), int(min_cell_col)
+    max_cell_row = min(int(max_cell_row), cell_index.cell_rows - 1)
+    max_cell_col = min(int(max_cell_col), cell_index.cell_cols - 1)
+    if min_cell_row > max_cell_row or min_cell_col > max_cell_col:
+        return np.zeros(0, dtype=np.int64)
+
+    row_nodes = [ cell_index.cell_nodes[ cell_index.cell_offsets[row * cell_index.cell_cols + min_cell_col] : cell_index.cell_offsets[row * cell_index.cell_cols + max_cell_col + 1] ]
+                  for row in range(min_cell_row, max_cell_row + 1) ]
+    return np.sort( np.concatenate(row_nodes) ).astype(np.int64)
+
+
+'''
+This function returns the numbers of the nodes of a graph lying within a bounding box (boundaries included)
+Inputs:
+1) road_graph = graph in CSR form
+2) min_lat, max_lat, min_lon, max_lon = bounding box
+3) cell_index = cell index of the graph from Create_cell_index. When it is given, only the nodes in the cells covering the box are
+checked, otherwise all the nodes of the graph are checked
+'''
+def Get_nodes_in_box(road_graph, min_lat, max_lat, min_lon, max_lon, cell_index=None):
+    if cell_index is None:
+        nodes = np.arange(len(road_graph.node_ids))
+    else:
+        nodes = Get_nodes_in_cells(cell_index, min_lat, max_lat, min_lon, max_lon)
+    node_lats = road_graph.node_lats[nodes]
+    node_lons = road_graph.node_lons[nodes]
+    return nodes[ (node_lats >= min_lat) & (node_lats <= max_lat) & (node_lons >= min_lon) & (node_lons <= max_lon) ]
+
+
+'''
+This function returns the subgraph of the given nodes of a graph, which keeps only the edges between these nodes
+Inputs:
+1) road_graph = graph in CSR form
+2) nodes = sorted array of node numbers. The node k of the subgraph is the node nodes[k] of the graph
+'''
+def Get_subgraph(road_graph, nodes):
+    edge_sources, edge_positions = Get_edges_of_nodes(road_graph, nodes)
+    edge_dests = road_graph.neighbours[edge_positions]
+    # the edges to the nodes which are not in the subgraph are dropped
+    subgraph_dests = np.minimum( np.searchsorted(nodes, edge_dests), max(len(nodes) - 1, 0) )
+    kept_edges = (nodes[subgraph_dests] == edge_dests)
+
+    subgraph_sources = np.searchsorted(nodes, edge_sources[kept_edges])
+    neighbour_offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum( np.bincount(subgraph_sources, minlength=len(nodes)), out=neighbour_offsets[1:] )
+    return Road_graph(road_graph.node_ids[nodes], road_graph.node_lats[nodes], road_graph.node_lons[nodes], neighbour_offsets,
+                      subgraph_dests[kept_edges].astype(np.int32), road_graph.edge_lengths[edge_positions[kept_edges]])
+
+
+'''
+This function returns the road length of every grid of a district in a single pass over the edges of its road graph.
+Each edge is walked once and split at every line of the grid lattice that it crosses, so the edges crossing a grid diagonally or
+spanning several grids add the length of their piece to every grid they pass through. The length of each piece is the Haversine
+distance between its two ends, which are interpolated linearly in latitude and longitude.
+Inputs:
+1) road_graph = road graph of the district in CSR form
+2) origin_lat, origin_lon = minimum latitude and longitude of the district bounding box, which lie on the lines of the lattice
+3) grid_rows, grid_cols = number of grids along the latitudes and the longitudes
+4) grid_size = size of the grids in degrees
+Output:
+1) grid_road_lengths = array of shape (grid_rows x grid_cols) with the road length in meters of the grid [latitude index, longitude index]
+'''
+def Get_grid_road_lengths(road_graph, origin_lat, origin_lon, grid_rows, grid_cols, grid_size=0.01):
+    # each undirected edge is walked once, from its node with the smaller number. Self loops have no length
+    edge_sources = np.repeat( np.arange(len(road_graph.node_ids)), Get_node_degrees(road_graph) )
+    walked_edges = edge_sources < road_graph.neighbours
+    edge_sources = edge_sources[walked_edges]
+    edge_dests = road_graph.neighbours[walked_edges]
+    source_lats, dest_lats = road_graph.node_lats[edge_sources], road_graph.node_lats[edge_dests]
+    source_lons, dest_lons = road_graph.node_lons[edge_sources], road_graph.node_lons[edge_dests]
+
+    # the coordinates in units of grids from the origin, so the lines of the lattice are at whole numbers
+    source_rows, dest_rows = (source_lats - origin_lat) / grid_size, (dest_lats - origin_lat) / grid_size
+    source_cols, dest_cols = (source_lons - origin_lon) / grid_size, (dest_lons - origin_lon) / grid_size
+
+    # the parameter t (0 at the source and 1 at the destination) of the ends of each edge and of its crossings with the lattice
+    crossing_edges = [ np.arange(len(edge_sources)), np.arange(len(edge_sources)) ]
+    crossing_parameters = [ np.zeros(len(edge_sources)), np.ones(len(edge_sources)) ]
+    for source_units, dest_units in [ (source_rows, dest_rows), (source_cols, dest_cols) ]:
+        first_lines = np.floor( np.minimum(source_units, dest_units) ).astype(np.int64) + 1
+        last_lines = np.floor( np.maximum(source_units, dest_units) ).astype(np.int64)
+        number_of_crossings = np.maximum(last_lines - first_lines + 1, 0)
+        edges = np.repeat( np.arange(len(edge_sources)), number_of_crossings )
+        lines = np.repeat( first_lines - (np.cumsum(number_of_crossings) - number_of_crossings), number_of_crossings ) + np.arange(number_of_crossings.sum())
+        crossing_edges.append(edges)
+        crossing_parameters.append( (lines - source_units[edges]) / (dest_units[edges] - source_units[edges]) )
+    crossing_edges = np.concatenate(crossing_edges)
+    crossing_parameters = np.clip( np.concatenate(crossing_parameters), 0.0, 1.0 )
+
+    # the pieces of each edge lie between its consecutive parameters, and each piece lies in the grid of its midpoint
+    crossing_order = np.lexsort( (crossing_parameters, crossing_edges) )
+    crossing_edges = crossing_edges[crossing_order]
+    crossing_parameters = crossing_parameters[crossing_order]
+    pieces = crossing_edges[:-1] == crossing_edges[1:]
+    piece_edges = crossing_edges[:-1][pieces]
+    piece_starts = crossing_parameters[:-1][pieces]
+    piece_ends = crossing_parameters[1:][pieces]
+    piece_middles = (piece_starts + piece_ends) / 2.0
+
+    edge_row_changes = dest_rows - source_rows
+    edge_col_changes = dest_cols - source_cols
+    piece_grid_rows = np.clip( np.floor(source_rows[piece_edges] + piece_middles * edge_row_changes[piece_edges]).astype(np.int64), 0, grid_rows - 1 )
+    piece_grid_cols = np.clip( np.floor(source_cols[piece_edges] + piece_middles * edge_col_changes[piece_edges]).astype(np.int64), 0, grid_cols - 1 )
+
+    edge_lat_changes = dest_lats - source_lats
+    edge_lon_changes = dest_lons - source_lons
+    piece_lengths = Get_haversine_distance(source_lats[piece_edges] + piece_starts * edge_lat_changes[piece_edges],
+                                           source_lons[piece_edges] + piece_starts * edge_lon_changes[piece_edges],
+                                           source_lats[piece_edges] + piece_ends * edge_lat_changes[piece_edges],
+                                           source_lons[piece_edges] + piece_ends * edge_lon_changes[piece_edges])
+
+    grid_road_lengths = np.bincount(piece_grid_rows * grid_cols + piece_grid_cols, weights=piece_lengths, minlength=grid_rows * grid_cols)
+    return grid_road_lengths.reshape(grid_rows, grid_cols)
+
+
+
+'''
+This function returns the grids (among grids laid next to each other along one axis) which contain each coordinate, boundaries included.
+A coordinate can only lie in the last grid whose minimum is not above it, and also in the grid before when it lies on the line between them
+Inputs:
+1) coordinates = array of latitudes (or longitudes)
+2) grid_minimums = minimum latitude (or longitude) of each grid, in increasing order
+3) grid_size = size of the grids in degrees
+Output:
+1) candidate_grids = array of shape (coordinates x 2) with the index of the grid before and of the last grid
+2) inside_grids = array of shape (coordinates x 2) which is True where the coordinate lies in the candidate grid
+'''
+def Get_grids_of_coordinates(coordinates, grid_minimums, grid_size):
+    last_grids = np.searchsorted(grid_minimums, coordinates, side='right') - 1
+    candidate_grids = np.column_stack((last_grids - 1, last_grids))
+    inside_grids = candidate_grids >= 0
+    candidate_grids = np.clip(candidate_grids, 0, len(grid_minimums) - 1)
+    inside_grids &= (grid_minimums[candidate_grids] <= coordinates[:, np.newaxis]) & (coordinates[:, np.newaxis] <= grid_minimums[candidate_grids] + grid_size)
+    return candidate_grids, inside_grids
+
+
+'''
+This function returns the number of intersections of every grid of a district in a single pass over the nodes of its road graph.
+The intersections are counted from the degree of the nodes, i.e. their number of neighbours in the road graph of the district, and
+a node lying on the boundary between grids is counted in each of them.
+Inputs:
+1) road_graph = road graph of the district in CSR form
+2) grid_min_lats = minimum latitude of each row of grids, in increasing order
+3) grid_min_lons = minimum longitude of each column of grids, in increasing order
+4) grid_size = size of the grids in degrees
+Output:
+1) grid_intersection_counts = array of shape (grid rows x grid columns x 4) with the number of dead ends (degree 1),
+3-way (degree 3), 4-way (degree 4) and 5 or more way (degree 5+) intersections of the grid [latitude index, longitude index]
+'''
+def Get_grid_intersection_counts(road_graph, grid_min_lats, grid_min_lons, grid_size=0.01):
+    node_degrees = Get_node_degrees(road_graph)
+    degree_classes = np.full(len(node_degrees), -1, dtype=np.int64)
+    degree_classes[node_degrees == 1] = 0
+    degree_classes[node_degrees == 3] = 1
+    degree_classes[node_degrees == 4] = 2
+    degree_classes[node_degrees >= 5] = 3
+    counted_nodes = np.flatnonzero(degree_classes >= 0)
+    degree_classes = degree_classes[counted_nodes]
+
+    row_grids, inside_rows = Get_grids_of_coordinates(road_graph.node_lats[counted_nodes], grid_min_lats, grid_size)
+    col_grids, inside_cols = Get_grids_of_coordinates(road_graph.node_lons[counted_nodes], grid_min_lons, grid_size)
+
+    # each node is counted once in every grid containing it, under the (grid, degree class) bin
+    grid_degree_bins = []
+    for row_candidate in range(2):
+        for col_candidate in range(2):
+            inside_grid = inside_rows[:, row_candidate] & inside_cols[:, col_candidate]
+            grids = row_grids[inside_grid, row_candidate] * len(grid_min_lons) + col_grids[inside_grid, col_candidate]
+            grid_degree_bins.append( grids * 4 + degree_classes[inside_grid] )
+    number_of_grids = len(grid_min_lats) * len(grid_min_lons)
+    grid_intersection_counts = np.bincount( np.concatenate(grid_degree_bins), minlength=number_of_grids * 4 )
+    return grid_intersection_counts.reshape(len(grid_min_lats), len(grid_min_lons), 4)
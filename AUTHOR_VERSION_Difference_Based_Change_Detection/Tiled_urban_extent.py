@@ -0,0 +1,145 @@
+import numpy as np
+import os, sys
+from Georeferenced_raster import Create_raster, Load_raster, Get_padded_shape, Get_padded_geotransform, Get_padded_window
+from Tiled_execution import Get_tiles
+from Parallel_execution import Run_in_parallel
+from Urban_extent import urban_threshold, periurban_threshold, Get_ellipse_kernel, Count_pixels_in_ellipse, Get_in_bounds_window_sizes, Label_from_BU_percentage
+
+
+'''
+The urban extent of a large region (e.g. a state-level mosaic) does not fit in memory along with its BU percentages and label maps.
+Here the BU/NBU maps are never built for the whole region. Each map is given as a source (raster_filepath, padding, label_lookup_table):
+the window of a tile in the padded map is read from the memory-mapped raster on disk with Get_padded_window, and its values are
+converted to BU/NBU labels with the lookup table of all 256 values (None keeps the values). Several maps can be read from the same
+raster, e.g. the BU/NBU maps of the first and last year from the CBU/CNBU/Changing map.
+The region is divided into tiles with a halo of ellipse_a rows and ellipse_b columns. The BU pixels within the WDC of every pixel of the core of a tile only depend on the pixels of its window,
+so each tile is labelled on its own in a pool of processes and written into memory-mapped output rasters.
+The total pixels of the WDC are computed from the position of the tile in the whole region, so the stitched result is
+exactly the same as labelling the whole region at once.
+'''
+urban_extent_tile_size = 2048 # number of rows and columns of the core of each tile
+
+
+'''
+This function reads the window of a tile in the padded BU/NBU map of a source
+'''
+def Get_BU_NBU_window(BU_NBU_source, window):
+    raster_filepath, padding, label_lookup_table = BU_NBU_source
+    raster, geotransform = Load_raster(raster_filepath)
+    BU_NBU_window = Get_padded_window(raster, padding, window)
+    if label_lookup_table is not None:
+        BU_NBU_window = np.asarray(label_lookup_table)[BU_NBU_window]
+    return BU_NBU_window
+
+
+'''
+This function returns the shape and the geotransform of the padded BU/NBU map of a source
+'''
+def Get_BU_NBU_shape_and_geotransform(BU_NBU_source):
+    raster_filepath, padding, label_lookup_table = BU_NBU_source
+    raster, geotransform = Load_raster(raster_filepath)
+    return Get_padded_shape(raster.shape, padding), Get_padded_geotransform(geotransform, padding)
+
+
+'''
+This function labels one tile of the urban extent for every pair of thresholds and writes it into the output rasters.
+The BU pixels within the WDC are counted once for each map, and shared by all the pairs of thresholds
+Inputs:
+1) BU_NBU_sources: (raster_filepath, padding, label_lookup_table) of the BU/NBU maps of the region with Background (0), BU (1), NBU (2),
+e.g. of the first and last year
+2) U_PU_R_filepaths_of_thresholds: for each pair of thresholds, the paths of the output rasters, one for each BU/NBU raster, created before
+3) window, core, core_in_window: the tile, from Get_tiles with a halo of (ellipse_a, ellipse_b)
+4) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+5) threshold_pairs: list of (urban_threshold, periurban_threshold), the thresholds of the BU percentage of urban and peri-urban pixels
+'''
+def Label_urban_extent_tile(BU_NBU_sources, U_PU_R_filepaths_of_thresholds, window, core, core_in_window, ellipse_a, ellipse_b, threshold_pairs):
+    image_shape, geotransform = Get_BU_NBU_shape_and_geotransform(BU_NBU_sources[0])
+    BU_NBU_windows = [ Get_BU_NBU_window(BU_NBU_source, window) for BU_NBU_source in BU_NBU_sources ]
+
+    rows_in_window, cols_in_window = Get_in_bounds_window_sizes(image_shape, ellipse_a, ellipse_b)
+    total_pixels_WDC = np.outer(rows_in_window[core[0]], cols_in_window[core[1]])
+    # the pixels which are non-background in any map are re-labelled in all the maps
+    labelled_pixels = np.zeros(total_pixels_WDC.shape, dtype=bool)
+    for BU_NBU_window in BU_NBU_windows:
+        labelled_pixels |= (BU_NBU_window[core_in_window] != 0)
+
+    ellipse_kernel = Get_ellipse_kernel(ellipse_a, ellipse_b)
+    for map_index, BU_NBU_window in enumerate(BU_NBU_windows):
+        BU_pixels_WDC = Count_pixels_in_ellipse(BU_NBU_window == 1, ellipse_kernel)[core_in_window]
+        BU_percentage = BU_pixels_WDC / total_pixels_WDC
+        del BU_pixels_WDC
+
+        for (urban_threshold, periurban_threshold), U_PU_R_filepaths in zip(threshold_pairs, U_PU_R_filepaths_of_thresholds):
+            U_PU_R_tile = Label_from_BU_percentage(BU_NBU_window[core_in_window], BU_percentage, labelled_pixels, urban_threshold, periurban_threshold)
+            U_PU_R_raster = np.load(U_PU_R_filepaths[map_index], mmap_mode='r+')
+            U_PU_R_raster[core] = U_PU_R_tile
+            U_PU_R_raster.flush()
+            del U_PU_R_raster
+
+
+'''
+This function re-labels the pixels of BU/NBU maps as urban, peri-urban or rural in tiles for several pairs of thresholds, in a pool of processes.
+Each tile is read and convolved once, and labelled with all the pairs of thresholds
+Inputs:
+1) BU_NBU_sources: (raster_filepath, padding, label_lookup_table) of the BU/NBU maps of the region with Background (0), BU (1), NBU (2),
+e.g. of the first and last year. The pixels which are non-background in any of the maps are re-labelled
+2) U_PU_R_filepaths_of_thresholds: for each pair of thresholds, the paths of the output rasters of the size of the padded maps, one for each BU/NBU map
+3) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+4) threshold_pairs: list of (urban_threshold, periurban_threshold), the thresholds of the BU percentage of urban and peri-urban pixels
+5) tile_size: number of rows and columns of the core of each tile. None labels the whole region as a single tile
+6) number_of_workers: number of processes. None uses all the cores and 1 labels the tiles one after another
+Output:
+1) for each pair of thresholds, the memory-mapped output rasters with Background (0), Urban (1), Peri-urban (2), Rural (3)
+'''
+def Label_urban_extent_in_tiles_for_thresholds(BU_NBU_sources, U_PU_R_filepaths_of_thresholds, ellipse_a, ellipse_b, threshold_pairs,
+                                               tile_size=urban_extent_tile_size, number_of_workers=None):
+    image_shape, geotransform = Get_BU_NBU_shape_and_geotransform(BU_NBU_sources[0])
+    for U_PU_R_filepaths in U_PU_R_filepaths_of_thresholds:
+        for U_PU_R_filepath in U_PU_R_filepaths:
+            U_PU_R_raster = Create_raster(U_PU_R_filepath, image_shape, np.uint8, geotransform)
+            del U_PU_R_raster
+
+    # only the sources of the maps, the paths of the outputs and the slices of the tile are sent to the workers
+    arguments_list = [ (BU_NBU_sources, U_PU_R_filepaths_of_thresholds, window, core, core_in_window, ellipse_a, ellipse_b, threshold_pairs)
+                       for window, core, core_in_window in Get_tiles(image_shape, tile_size, halo=(ellipse_a, ellipse_b)) ]
+    Run_in_parallel(Label_urban_extent_tile, arguments_list, number_of_workers)
+    # the rasters are returned as plain arrays backed by the memory-maps, which are faster to index pixel by pixel
+    return [ [ np.asarray(Load_raster(U_PU_R_filepath)[0]) for U_PU_R_filepath in U_PU_R_filepaths ] for U_PU_R_filepaths in U_PU_R_filepaths_of_thresholds ]
+
+
+'''
+This function re-labels the pixels of BU/NBU maps as urban, peri-urban or rural in tiles, in a pool of processes
+Inputs:
+1) BU_NBU_sources: (raster_filepath, padding, label_lookup_table) of the BU/NBU maps of the region with Background (0), BU (1), NBU (2),
+e.g. of the first and last year. The pixels which are non-background in any of the maps are re-labelled
+2) U_PU_R_filepaths: paths of the output rasters of the size of the padded maps, one for each BU/NBU map
+3) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+4) urban_threshold, periurban_threshold: thresholds of the BU percentage of urban and peri-urban pixels
+5) tile_size: number of rows and columns of the core of each tile. None labels the whole region as a single tile
+6) number_of_workers: number of processes. None uses all the cores and 1 labels the tiles one after another
+Output:
+1) U_PU_R_rasters: memory-mapped output rasters with Background (0), Urban (1), Peri-urban (2), Rural (3)
+'''
+def Label_urban_extent_in_tiles(BU_NBU_sources, U_PU_R_filepaths, ellipse_a, ellipse_b, urban_threshold=urban_threshold, periurban_threshold=periurban_threshold,
+                                tile_size=urban_extent_tile_size, number_of_workers=None):
+    return Label_urban_extent_in_tiles_for_thresholds(BU_NBU_sources, [U_PU_R_filepaths], ellipse_a, ellipse_b, [(urban_threshold, periurban_threshold)],
+                                                      tile_size, number_of_workers)[0]
+
+
+'''
+This function re-labels the pixels of BU/NBU maps in tiles for every combination of ellipse and thresholds, like Sweep_urban_extent.
+The tiles are convolved once for each ellipse, and labelled with all the pairs of thresholds.
+The output rasters of each combination are saved in U_PU_R_directory as <name>_U_PU_R_<a>_<b>_U<u>_PU<pu>.npy, with one name for each map
+Output:
+For each ellipse and pair of thresholds, the tuple ((ellipse_a, ellipse_b), (urban_threshold, periurban_threshold), U_PU_R_rasters)
+'''
+def Sweep_urban_extent_in_tiles(BU_NBU_sources, BU_NBU_names, ellipse_axes_list, threshold_pairs, U_PU_R_directory, tile_size=urban_extent_tile_size, number_of_workers=None):
+    for ellipse_a, ellipse_b in ellipse_axes_list:
+        U_PU_R_filepaths_of_thresholds = []
+        for urban_threshold, periurban_threshold in threshold_pairs:
+            setting_name = '_U_PU_R_'+str(ellipse_a)+'_'+str(ellipse_b)+'_U'+str(urban_threshold)+'_PU'+str(periurban_threshold)
+            U_PU_R_filepaths_of_thresholds.append( [ U_PU_R_directory+'/'+BU_NBU_name+setting_name+'.npy' for BU_NBU_name in BU_NBU_names ] )
+        U_PU_R_rasters_of_thresholds = Label_urban_extent_in_tiles_for_thresholds(BU_NBU_sources, U_PU_R_filepaths_of_thresholds, ellipse_a, ellipse_b, threshold_pairs,
+                                                                                  tile_size, number_of_workers)
+        for threshold_pair, U_PU_R_rasters in zip(threshold_pairs, U_PU_R_rasters_of_thresholds):
+            yield (ellipse_a, ellipse_b), threshold_pair, U_PU_R_rasters
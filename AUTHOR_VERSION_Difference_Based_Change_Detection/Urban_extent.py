@@ -0,0 +1,364 @@
+import numpy as np
+from scipy import signal, fft
+from math import floor
+from Tiled_execution import Get_tiles
+
+
+'''
+A pixel is re-labelled as urban, peri-urban or rural based on the percentage of BU pixels within its walking distance circle (WDC).
+Since the distribution of pixels about x-axis and y-axis is not same, the WDC is an ellipse of ellipse_a pixels along the rows
+and ellipse_b pixels along the columns.
+For a pixel (i,j), the BU pixels are counted inside the ellipse ((u-i)^2 b^2)+((v-j)^2 a^2)-(a^2 b^2) <= 0, while the total pixels
+are all the pixels of the (2a+1) x (2b+1) window around it which lie inside the image.
+Instead of scanning the window of every pixel, the BU pixels of all pixels are counted with one convolution of the BU mask
+with an elliptical kernel, and the total pixels are the product of the in-bounds window sizes along the rows and the columns.
+'''
+WDC_radius = 564 # this is radius of walking_distance_circle (WDC) in meters
+urban_threshold = 0.50 # pixels with more than 50% BU pixels in WDC are urban
+periurban_threshold = 0.25 # pixels with >=25% and <50% BU pixels in WDC are peri-urban
+update_tile_size = 256 # size of the tiles in which the BU pixels within the WDC are updated in the incremental mode
+dense_change_fraction = 0.5 # if more tiles than this fraction have changes, the whole image is updated at once
+
+
+'''
+This function returns the number of pixels along the radius of the ellipse of the WDC along the rows (a) and the columns (b)
+Inputs:
+1) WDC_radius = radius of the WDC in meters
+2) image_shape = (rows, columns) of the district image
+3) district_height, district_width = distance in meters covered by the rows and the columns of the image
+'''
+def Get_ellipse_axes(WDC_radius, image_shape, district_height, district_width):
+    ellipse_a = floor( (WDC_radius * image_shape[0]) / district_height )
+    ellipse_b = floor( (WDC_radius * image_shape[1]) / district_width )
+    return ellipse_a, ellipse_b
+
+
+'''
+This function returns the elliptical kernel of the WDC, with value 1 for the pixels inside the ellipse and 0 otherwise
+Output:
+1) ellipse_kernel = array of shape (2a+1) x (2b+1)
+'''
+def Get_ellipse_kernel(ellipse_a, ellipse_b):
+    u = np.arange(-ellipse_a, ellipse_a+1, dtype=np.int64)[:, None]
+    v = np.arange(-ellipse_b, ellipse_b+1, dtype=np.int64)[None, :]
+    inside_ellipse = (u**2 * ellipse_b**2) + (v**2 * ellipse_a**2) - (ellipse_a**2 * ellipse_b**2) <= 0
+    return inside_ellipse.astype(np.float64)
+
+
+'''
+This function counts, for every pixel, the pixels of a mask which lie inside the ellipse around it.
+The pixels outside the image are not counted.
+'''
+def Count_pixels_in_ellipse(pixel_mask, ellipse_kernel):
+    counts = signal.oaconvolve(pixel_mask.astype(np.float64), ellipse_kernel, mode='same')
+    # the convolution is computed with FFTs, so the counts are rounded back to the exact integers
+    return np.rint(counts).astype(np.int64)
+
+
+'''
+This function returns, for every row (column) of the image, the number of rows (columns) of the (2a+1) x (2b+1) window
+around it which lie inside the image
+'''
+def Get_in_bounds_window_sizes(image_shape, ellipse_a, ellipse_b):
+    rows = np.arange(image_shape[0])
+    cols = np.arange(image_shape[1])
+    rows_in_window = np.minimum(rows + ellipse_a, image_shape[0]-1) - np.maximum(rows - ellipse_a, 0) + 1
+    cols_in_window = np.minimum(cols + ellipse_b, image_shape[1]-1) - np.maximum(cols - ellipse_b, 0) + 1
+    return rows_in_window.astype(np.int64), cols_in_window.astype(np.int64)
+
+
+'''
+This function counts, for every pixel, the pixels of the (2a+1) x (2b+1) window around it which lie inside the image
+'''
+def Count_in_bounds_pixels_in_window(image_shape, ellipse_a, ellipse_b):
+    rows_in_window, cols_in_window = Get_in_bounds_window_sizes(image_shape, ellipse_a, ellipse_b)
+    return np.outer(rows_in_window, cols_in_window)
+
+
+'''
+This function returns the number of BU pixels within the WDC of every pixel
+Inputs:
+1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
+2) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+'''
+def Get_BU_pixels_in_WDC(BU_NBU_map, ellipse_a, ellipse_b):
+    return Count_pixels_in_ellipse(BU_NBU_map == 1, Get_ellipse_kernel(ellipse_a, ellipse_b))
+
+
+'''
+This function returns the percentage of BU pixels within the WDC of every pixel
+Inputs:
+1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
+2) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+'''
+def Get_BU_percentage_in_WDC(BU_NBU_map, ellipse_a, ellipse_b):
+    BU_pixels_WDC = Get_BU_pixels_in_WDC(BU_NBU_map, ellipse_a, ellipse_b)
+    total_pixels_WDC = Count_in_bounds_pixels_in_window(BU_NBU_map.shape, ellipse_a, ellipse_b)
+    return BU_pixels_WDC / total_pixels_WDC
+
+
+'''
+This function re-labels pixels as urban, peri-urban or rural using the percentage of BU pixels within their WDC
+Inputs:
+1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
+2) BU_percentage: percentage of BU pixels within the WDC of each pixel
+3) labelled_pixels: boolean mask of the pixels to be re-labelled
+4) urban_threshold, periurban_threshold: pixels with BU percentage >= urban_threshold are urban, and the others
+with BU percentage >= periurban_threshold are peri-urban. The rest are rural
+Output:
+1) Urban_Periurban_Rural_map: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3)
+'''
+def Label_from_BU_percentage(BU_NBU_map, BU_percentage, labelled_pixels, urban_threshold=urban_threshold, periurban_threshold=periurban_threshold):
+    Urban_Periurban_Rural_map = np.copy(BU_NBU_map)
+    Urban_Periurban_Rural_map[ labelled_pixels & (BU_percentage >= urban_threshold) ] = 1 #pixel is urban
+    Urban_Periurban_Rural_map[ labelled_pixels & (BU_percentage < urban_threshold) & (BU_percentage >= periurban_threshold) ] = 2 #pixel is peri-urban
+    Urban_Periurban_Rural_map[ labelled_pixels & (BU_percentage < periurban_threshold) ] = 3 #pixel is rural
+    return Urban_Periurban_Rural_map
+
+
+'''
+This function re-labels pixels as urban, peri-urban or rural based on the percentage of BU pixels within their WDC
+Inputs:
+1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
+2) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+3) labelled_pixels: boolean mask of the pixels to be re-labelled. By default, all non-background pixels are re-labelled
+Output:
+1) Urban_Periurban_Rural_map: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3)
+'''
+def Label_urban_extent(BU_NBU_map, ellipse_a, ellipse_b, labelled_pixels=None):
+    if labelled_pixels is None:
+        labelled_pixels = (BU_NBU_map != 0)
+    BU_percentage = Get_BU_percentage_in_WDC(BU_NBU_map, ellipse_a, ellipse_b)
+    return Label_from_BU_percentage(BU_NBU_map, BU_percentage, labelled_pixels)
+
+
+'''
+Over a tall region, the meters covered by a pixel along the columns change with the latitude, so a single ellipse does not hold
+for all the rows. The rows of the image are then divided into latitude bands, each with its own ellipse. The BU pixels within the WDC
+of the pixels of a band are counted with one convolution of the rows of the band, along with a halo of ellipse_a rows above and below
+it, with the elliptical kernel of the band. The ellipse of a pixel near the edge of a band extends into the rows of the next band,
+so the pixels are counted exactly as if the kernel of the band was used for the whole image.
+'''
+
+
+'''
+This function divides the rows of an image into latitude bands of nearly equal number of rows
+Inputs:
+1) image_shape = (rows, columns) of the image, whose first row is at max_lat and last row at min_lat
+2) min_lat, max_lat = latitudes of the bottom and the top of the image
+3) number_of_bands = number of latitude bands
+Output:
+1) latitude_bands = list of (row_start, row_stop, band_min_lat, band_max_lat) of each band, from the top of the image
+'''
+def Get_latitude_bands(image_shape, min_lat, max_lat, number_of_bands):
+    row_edges = [ floor( (image_shape[0] * band) / number_of_bands ) for band in range(number_of_bands + 1) ]
+    latitude_bands = []
+    for row_start, row_stop in zip(row_edges[:-1], row_edges[1:]):
+        band_max_lat = max_lat - ( (max_lat - min_lat) * row_start ) / image_shape[0]
+        band_min_lat = max_lat - ( (max_lat - min_lat) * row_stop ) / image_shape[0]
+        latitude_bands.append( (row_start, row_stop, band_min_lat, band_max_lat) )
+    return latitude_bands
+
+
+'''
+This function returns the percentage of BU pixels within the WDC of every pixel, using the ellipse of the latitude band of each row
+Inputs:
+1) BU_NBU_map: This is the BU/NBU map with Background (0), BU (1), NBU (2)
+2) band_ellipses: list of (row_start, row_stop, ellipse_a, ellipse_b) of each latitude band, covering all the rows of the map
+'''
+def Get_BU_percentage_in_latitude_bands(BU_NBU_map, band_ellipses):
+    rows = BU_NBU_map.shape[0]
+    BU_percentage = np.empty(BU_NBU_map.shape, dtype=np.float64)
+    for row_start, row_stop, ellipse_a, ellipse_b in band_ellipses:
+        # the rows of the band are convolved along with a halo of ellipse_a rows on each side
+        window_start = max(0, row_start - ellipse_a)
+        window_stop = min(rows, row_stop + ellipse_a)
+        BU_pixels_WDC = Count_pixels_in_ellipse(BU_NBU_map[window_start:window_stop] == 1, Get_ellipse_kernel(ellipse_a, ellipse_b))
+        BU_pixels_WDC = BU_pixels_WDC[row_start - window_start : row_stop - window_start]
+
+        rows_in_window, cols_in_window = Get_in_bounds_window_sizes(BU_NBU_map.shape, ellipse_a, ellipse_b)
+        BU_percentage[row_start:row_stop] = BU_pixels_WDC / np.outer(rows_in_window[row_start:row_stop], cols_in_window)
+    return BU_percentage
+
+
+'''
+This function re-labels pixels as urban, peri-urban or rural for every combination of the ellipses of latitude bands and thresholds,
+like Sweep_urban_extent
+Inputs:
+1) BU_NBU_maps: list of BU/NBU maps of the same region (e.g. first and last year) with Background (0), BU (1), NBU (2)
+2) band_ellipses_list: list of band_ellipses, one for each WDC radius. Each band_ellipses is a tuple of (row_start, row_stop, ellipse_a, ellipse_b)
+of each latitude band
+3) threshold_pairs: list of (urban_threshold, periurban_threshold)
+4) labelled_pixels: boolean mask of the pixels to be re-labelled. By default, the pixels which are non-background in any map
+Output:
+For each band_ellipses and pair of thresholds, the tuple (band_ellipses, (urban_threshold, periurban_threshold), Urban_Periurban_Rural_maps)
+'''
+def Sweep_urban_extent_in_latitude_bands(BU_NBU_maps, band_ellipses_list, threshold_pairs, labelled_pixels=None):
+    if labelled_pixels is None:
+        labelled_pixels = np.zeros(BU_NBU_maps[0].shape, dtype=bool)
+        for BU_NBU_map in BU_NBU_maps:
+            labelled_pixels |= (BU_NBU_map != 0)
+
+    for band_ellipses in band_ellipses_list:
+        BU_percentages = [ Get_BU_percentage_in_latitude_bands(BU_NBU_map, band_ellipses) for BU_NBU_map in BU_NBU_maps ]
+        for urban_threshold, periurban_threshold in threshold_pairs:
+            Urban_Periurban_Rural_maps = [ Label_from_BU_percentage(BU_NBU_map, BU_percentage, labelled_pixels, urban_threshold, periurban_threshold)
+                                           for BU_NBU_map, BU_percentage in zip(BU_NBU_maps, BU_percentages) ]
+            yield band_ellipses, (urban_threshold, periurban_threshold), Urban_Periurban_Rural_maps
+
+
+'''
+In the incremental mode, the urban extent of a year is updated from the one of a previous year instead of being computed again.
+The BU pixels within the WDC only change for the pixels whose ellipse contains a pixel which became BU (or stopped being BU), e.g. the
+Changing pixels of the CBU/CNBU/Changing map. The image is divided into tiles with a halo of the radius of the ellipse, and the change
+of the BU pixels is convolved with the elliptical kernel only in the tiles which have a changed pixel within their halo.
+When the changes are spread over most of the tiles, the change of the whole image is convolved at once instead.
+Only the pixels whose count of BU pixels moved are labelled again; the others keep the label of the previous year.
+'''
+
+
+'''
+This function updates the number of BU pixels within the WDC of every pixel after a change of the BU pixels
+Inputs:
+1) BU_pixels_WDC: number of BU pixels within the WDC of every pixel in the previous year, from Get_BU_pixels_in_WDC
+2) BU_change: integer image with +1 for the pixels which became BU, -1 for the pixels which are no longer BU, and 0 otherwise
+3) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+4) tile_size: size of the tiles in which the change is convolved
+Output:
+1) updated_BU_pixels_WDC: number of BU pixels within the WDC of every pixel after the change
+2) moved_pixels: boolean mask of the pixels whose number of BU pixels within the WDC changed
+'''
+def Update_BU_pixels_in_WDC(BU_pixels_WDC, BU_change, ellipse_a, ellipse_b, tile_size=update_tile_size):
+    updated_BU_pixels_WDC = np.copy(BU_pixels_WDC)
+    moved_pixels = np.zeros(BU_pixels_WDC.shape, dtype=bool)
+    ellipse_kernel = Get_ellipse_kernel(ellipse_a, ellipse_b)
+
+    # a changed pixel only affects the pixels within its ellipse, so the tiles with no change in their halo are skipped
+    tiles = Get_tiles(BU_change.shape, tile_size, halo=(ellipse_a, ellipse_b))
+    changed_tiles = [ (window, core, core_in_window) for window, core, core_in_window in tiles if BU_change[window].any() ]
+    # when the changes are spread over most of the image, a single convolution of the whole image is cheaper
+    if len(changed_tiles) > len(tiles) * dense_change_fraction:
+        whole_image = ( slice(0, BU_change.shape[0]), slice(0, BU_change.shape[1]) )
+        changed_tiles = [ (whole_image, whole_image, whole_image) ]
+
+    for window, core, core_in_window in changed_tiles:
+        change_in_WDC = Count_pixels_in_ellipse(BU_change[window], ellipse_kernel)[core_in_window]
+        updated_BU_pixels_WDC[core] += change_in_WDC
+        moved_pixels[core] = (change_in_WDC != 0)
+    return updated_BU_pixels_WDC, moved_pixels
+
+
+'''
+This function labels again the pixels of the urban extent of a previous year whose number of BU pixels within the WDC moved
+Inputs:
+1) previous_Urban_Periurban_Rural_map: urban extent of the previous year, labelled with the same ellipse and thresholds
+2) BU_NBU_map: This is the BU/NBU map of the year with Background (0), BU (1), NBU (2)
+3) BU_pixels_WDC, moved_pixels: number of BU pixels within the WDC of the year and the pixels whose number moved, from Update_BU_pixels_in_WDC
+4) labelled_pixels: boolean mask of the pixels to be re-labelled
+5) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+6) urban_threshold, periurban_threshold: thresholds of the BU percentage of urban and peri-urban pixels
+Output:
+1) Urban_Periurban_Rural_map: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3)
+'''
+def Relabel_moved_pixels(previous_Urban_Periurban_Rural_map, BU_NBU_map, BU_pixels_WDC, moved_pixels, labelled_pixels, ellipse_a, ellipse_b, urban_threshold=urban_threshold, periurban_threshold=periurban_threshold):
+    Urban_Periurban_Rural_map = np.copy(previous_Urban_Periurban_Rural_map)
+    # the pixels which are not re-labelled keep the value of the BU/NBU map of the year
+    unlabelled_pixels = ~labelled_pixels
+    Urban_Periurban_Rural_map[unlabelled_pixels] = BU_NBU_map[unlabelled_pixels]
+
+    pixel_rows, pixel_cols = np.nonzero(moved_pixels & labelled_pixels)
+    rows_in_window, cols_in_window = Get_in_bounds_window_sizes(BU_NBU_map.shape, ellipse_a, ellipse_b)
+    BU_percentage = BU_pixels_WDC[pixel_rows, pixel_cols] / (rows_in_window[pixel_rows] * cols_in_window[pixel_cols])
+
+    moved_labels = Urban_Periurban_Rural_map[pixel_rows, pixel_cols]
+    moved_labels[ BU_percentage >= urban_threshold ] = 1 #pixel is urban
+    moved_labels[ (BU_percentage < urban_threshold) & (BU_percentage >= periurban_threshold) ] = 2 #pixel is peri-urban
+    moved_labels[ BU_percentage < periurban_threshold ] = 3 #pixel is rural
+    Urban_Periurban_Rural_map[pixel_rows, pixel_cols] = moved_labels
+    return Urban_Periurban_Rural_map
+
+
+'''
+This function updates the urban extent of a previous year with the change of the BU pixels of the year
+Inputs:
+1) previous_Urban_Periurban_Rural_map: urban extent of the previous year, from Label_urban_extent or this function
+2) previous_BU_pixels_WDC: number of BU pixels within the WDC of every pixel in the previous year, from Get_BU_pixels_in_WDC or this function
+3) BU_NBU_map: This is the BU/NBU map of the year with Background (0), BU (1), NBU (2)
+4) BU_change: integer image with +1 for the pixels which became BU, -1 for the pixels which are no longer BU, and 0 otherwise
+5) ellipse_a, ellipse_b: number of pixels along the radius of the ellipse along the rows and the columns
+6) labelled_pixels: boolean mask of the pixels to be re-labelled, the same as for the previous year. By default, all non-background pixels
+Output:
+1) Urban_Periurban_Rural_map: This is the re-labeled pixel map with Background (0), Urban (1), Peri-urban (2), Rural (3)
+2) BU_pixels_WDC: number of BU pixels within the WDC of every pixel in the year, for updating the next year
+'''
+def Update_urban_extent(previous_Urban_Periurban_Rural_map, previous_BU_pixels_WDC, BU_NBU_map, BU_change, ellipse_a, ellipse_b, labelled_pixels=None):
+    if labelled_pixels is None:
+        labelled_pixels = (BU_NBU_map != 0)
+    BU_pixels_WDC, moved_pixels = Update_BU_pixels_in_WDC(previous_BU_pixels_WDC, BU_change, ellipse_a, ellipse_b)
+    Urban_Periurban_Rural_map = Relabel_moved_pixels(previous_Urban_Periurban_Rural_map, BU_NBU_map, BU_pixels_WDC, moved_pixels, labelled_pixels, ellipse_a, ellipse_b)
+    return Urban_Periurban_Rural_map, BU_pixels_WDC
+
+
+'''
+In a sweep, the urban extent is computed for several WDC radii and thresholds. The work is shared in two ways:
+1) the FFT of the BU mask of each year is computed only once, on a size large enough for the largest ellipse, and for each
+radius only the FFT of its kernel and one inverse FFT per year are needed
+2) the BU percentage of a radius is computed once and then labelled with every pair of thresholds, which costs only a comparison
+'''
+
+
+'''
+This function re-labels pixels as urban, peri-urban or rural for every combination of ellipse and thresholds.
+The combinations are returned one at a time, so only the maps of one combination are held in memory.
+Inputs:
+1) BU_NBU_maps: list of BU/NBU maps of the same district (e.g. first and last year) with Background (0), BU (1), NBU (2)
+2) ellipse_axes_list: list of (ellipse_a, ellipse_b) of the WDC of each radius, from Get_ellipse_axes
+3) threshold_pairs: list of (urban_threshold, periurban_threshold)
+4) labelled_pixels: boolean mask of the pixels to be re-labelled. By default, the pixels which are non-background in any map
+5) BU_changes: list with the change of the BU pixels (+1, -1 or 0) from each map to the next one, e.g. the Changing pixels of the
+CBU/CNBU/Changing map. When given, only the first map is computed in full and the later maps are updated incrementally
+Output:
+For each ellipse and pair of thresholds, the tuple ((ellipse_a, ellipse_b), (urban_threshold, periurban_threshold), Urban_Periurban_Rural_maps)
+where Urban_Periurban_Rural_maps has the re-labelled map of each of the BU_NBU_maps
+'''
+def Sweep_urban_extent(BU_NBU_maps, ellipse_axes_list, threshold_pairs, labelled_pixels=None, BU_changes=None):
+    image_shape = BU_NBU_maps[0].shape
+    if labelled_pixels is None:
+        labelled_pixels = np.zeros(image_shape, dtype=bool)
+        for BU_NBU_map in BU_NBU_maps:
+            labelled_pixels |= (BU_NBU_map != 0)
+
+    # the FFTs are computed on a shape which holds the full convolution with the largest ellipse
+    largest_a = max(ellipse_a for ellipse_a, ellipse_b in ellipse_axes_list)
+    largest_b = max(ellipse_b for ellipse_a, ellipse_b in ellipse_axes_list)
+    fft_shape = ( fft.next_fast_len(image_shape[0] + 2*largest_a, real=True), fft.next_fast_len(image_shape[1] + 2*largest_b, real=True) )
+    # in the incremental mode, only the first map is convolved in full
+    fully_computed_maps = BU_NBU_maps if BU_changes is None else BU_NBU_maps[:1]
+    BU_mask_ffts = [ fft.rfft2( (BU_NBU_map == 1).astype(np.float64), fft_shape ) for BU_NBU_map in fully_computed_maps ]
+
+    for ellipse_a, ellipse_b in ellipse_axes_list:
+        kernel_fft = fft.rfft2( Get_ellipse_kernel(ellipse_a, ellipse_b), fft_shape )
+        total_pixels_WDC = Count_in_bounds_pixels_in_window(image_shape, ellipse_a, ellipse_b)
+
+        BU_percentages = []
+        for BU_mask_fft in BU_mask_ffts:
+            full_counts = fft.irfft2( BU_mask_fft * kernel_fft, fft_shape )
+            # the pixel (i,j) of the image is at (i+a, j+b) in the full convolution
+            BU_pixels_WDC = np.rint( full_counts[ellipse_a:ellipse_a+image_shape[0], ellipse_b:ellipse_b+image_shape[1]] ).astype(np.int64)
+            BU_percentages.append( BU_pixels_WDC / total_pixels_WDC )
+            del full_counts
+
+        # the BU pixels within the WDC of the later maps are updated from the previous map
+        updated_BU_pixels = []
+        if BU_changes is not None:
+            for BU_change in BU_changes:
+                BU_pixels_WDC, moved_pixels = Update_BU_pixels_in_WDC(BU_pixels_WDC, BU_change, ellipse_a, ellipse_b)
+                updated_BU_pixels.append( (BU_pixels_WDC, moved_pixels) )
+
+        for urban_threshold, periurban_threshold in threshold_pairs:
+            Urban_Periurban_Rural_maps = [ Label_from_BU_percentage(BU_NBU_map, BU_percentage, labelled_pixels, urban_threshold, periurban_threshold)
+                                           for BU_NBU_map, BU_percentage in zip(fully_computed_maps, BU_percentages) ]
+            for BU_NBU_map, (BU_pixels_WDC, moved_pixels) in zip(BU_NBU_maps[1:], updated_BU_pixels):
+                Urban_Periurban_Rural_maps.append( Relabel_moved_pixels(Urban_Periurban_Rural_maps[-1], BU_NBU_map, BU_pixels_WDC, moved_pixels, labelled_pixels,
+                                                                        ellipse_a, ellipse_b, urban_threshold, periurban_threshold) )
+            yield (ellipse_a, ellipse_b), (urban_threshold, periurban_threshold), Urban_Periurban_Rural_maps
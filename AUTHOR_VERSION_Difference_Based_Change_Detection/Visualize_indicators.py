@@ -13,6 +13,8 @@ import matplotlib.pyplot as plt
 import sys, os
 from PIL import Image
 from math import ceil, floor
+from Georeferenced_raster import Get_padding, Pad_raster
+from Map_rendering import grid_class_legend, grid_type_legend, CBU_CNBU_Changing_urbanization_legend, Get_legend_values, Save_rendered_map
 
 '''
 Getting the latitude and longitude bounding box of the district
@@ -36,78 +38,65 @@ Inputs:
 3) rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon: Rounded off bounding box
 '''
 def Pad_image(BU_NBU_map, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon):
-    # since (max_coordinate - min_coordinate) = #row/column pixels, thus using unitary method
-    top_rows = ceil( BU_NBU_map.shape[0] * ( (rounded_max_lat - max_lat) / (max_lat - min_lat) ) )
-    bottom_rows = ceil( BU_NBU_map.shape[0] * ( (min_lat - rounded_min_lat) / (max_lat - min_lat) ) )
-    left_columns = ceil( BU_NBU_map.shape[1] * ( (min_lon - rounded_min_lon) / (max_lon - min_lon) ) )
-    right_columns = ceil( BU_NBU_map.shape[1] * ( (rounded_max_lon - max_lon) / (max_lon - min_lon) ) )
+    # the padded image is created as a single copy which keeps the data type of the map
+    padding = Get_padding(BU_NBU_map.shape, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon, rounding=ceil)
+    return Pad_raster(BU_NBU_map, padding)
 
-    for row in range(top_rows):
-        BU_NBU_map = np.insert(BU_NBU_map, 0, np.zeros( (BU_NBU_map.shape[1],), dtype=int), axis=0)
-    for row in range(bottom_rows):
-        BU_NBU_map = np.insert(BU_NBU_map, len(BU_NBU_map), np.zeros( (BU_NBU_map.shape[1],), dtype=int), axis=0)
-    for column in range(left_columns):
-        BU_NBU_map = np.c_[ np.zeros( (BU_NBU_map.shape[0],), dtype=int ), BU_NBU_map ]
-    for column in range(right_columns):
-        BU_NBU_map = np.c_[ BU_NBU_map, np.zeros( (BU_NBU_map.shape[0],), dtype=int ) ]
 
-    return BU_NBU_map
+'''
+This function returns the number of the grid of every pixel of the padded district image.
+The grids are numbered from the bottom left of the district, along the rows of grids from bottom to top and then the columns
+'''
+def Get_pixel_grid_numbers(image_shape, min_lat, max_lat, min_lon, max_lon):
+    # image dimensions in number of grids (of size 0.01 x 0.01 deg)
+    img_height_grids = round( (max_lat - min_lat) * 100.0 ) 
+    img_width_grids = round( (max_lon - min_lon) * 100.0 )
+
+    # grid dimensions in number of pixels
+    grid_height_pix = image_shape[0] / img_height_grids
+    grid_width_pix = image_shape[1] / img_width_grids    
+
+    # the grid row of every row of pixels and the grid column of every column of pixels
+    grid_rows = np.floor( np.arange(image_shape[0]) / grid_height_pix ).astype(np.int64)
+    grid_cols = np.floor( np.arange(image_shape[1]) / grid_width_pix ).astype(np.int64)
+    return ( grid_cols[None, :] * img_height_grids ) + ( img_height_grids - grid_rows[:, None] - 1 )
+
+
+'''
+This function returns the label raster of a grid map, with the label of its grid for every non-background pixel and 0 for
+background pixels
+Inputs:
+1) sample_image = padded district image with background pixels having value 0
+2) min_lat, max_lat, min_lon, max_lon = rounded bounding box of the district
+3) grid_label_mapping = dictionary of the label value of each grid number
+'''
+def Get_grid_label_raster(sample_image, min_lat, max_lat, min_lon, max_lon, grid_label_mapping):
+    pixel_grid_numbers = Get_pixel_grid_numbers(sample_image.shape, min_lat, max_lat, min_lon, max_lon)
+    non_background_pixels = (sample_image != 0)
+    # the label of each grid is looked up once, and then given to all the pixels of the grid
+    grid_numbers, pixel_grid_indices = np.unique(pixel_grid_numbers[non_background_pixels], return_inverse=True)
+    grid_labels = np.array([ grid_label_mapping[grid_number] for grid_number in grid_numbers ], dtype=np.uint8)
+
+    grid_label_raster = np.zeros(sample_image.shape, dtype=np.uint8)
+    grid_label_raster[non_background_pixels] = grid_labels[pixel_grid_indices.reshape(-1)]
+    return grid_label_raster
 
 
 '''
 This function plots the district image with C1-C5 grid visualization
 '''
 def Plot_grid_classes(district, sample_image, min_lat, max_lat, min_lon, max_lon, indicators_dataframe, year):
-    # designate RGB color to each grid class    
-    background_color = [0,0,0]
-    rejected_color = [255,255,255]
-    c1_color = [255,215,0] # Yellow
-    c2_color = [178,255,102] # Light_Green
-    c3_color = [0,204,0] # Green
-    c4_color = [0,102,0] # Dark_Green
-    c5_color = [255,0,0] # Red
-        
-    final_image = np.zeros([sample_image.shape[0], sample_image.shape[1], 3], dtype=np.uint8) 
-    
     # Create dictionary of grid number to class label mapping from dataframe
     grid_class_mapping = indicators_dataframe.set_index("Grid_number").to_dict()["Class_label"]
+    # the rejected grids (class 0) and the classes C1-C5 are drawn with the colors of the shared legend
+    legend_values = Get_legend_values(grid_class_legend)
+    class_label_values = { 0: legend_values['Rejected'], 1: legend_values['C1'], 2: legend_values['C2'], 3: legend_values['C3'], 4: legend_values['C4'], 5: legend_values['C5'] }
+    grid_label_mapping = { grid_number: class_label_values.get(class_label, 0) for grid_number, class_label in grid_class_mapping.items() }
 
-    # image dimensions in number of grids (of size 0.01 x 0.01 deg)
-    img_height_grids = round( (max_lat - min_lat) * 100.0 ) 
-    img_width_grids = round( (max_lon - min_lon) * 100.0 )
-
-    # grid dimensions in number of pixels
-    grid_height_pix = sample_image.shape[0] / img_height_grids
-    grid_width_pix = sample_image.shape[1] / img_width_grids    
-
-    # Allocating the grid number to each pixel
-    for i in range(final_image.shape[0]):
-        for j in range(final_image.shape[1]):
-            if sample_image[i][j] == 0: # if this pixel is a background pixel
-                final_image[i][j] = background_color
-            else:
-                grid_row = floor( i / grid_height_pix )
-                grid_col = floor( j / grid_width_pix )
-                grid_number = ( grid_col * img_height_grids ) + ( img_height_grids - grid_row -1 )
-                class_label = grid_class_mapping[grid_number]
-                if class_label == 0:
-                    final_image[i][j] = rejected_color
-                elif class_label == 1:
-                    final_image[i][j] = c1_color
-                elif class_label == 2:
-                    final_image[i][j] = c2_color
-                elif class_label == 3:
-                    final_image[i][j] = c3_color
-                elif class_label == 4:
-                    final_image[i][j] = c4_color
-                elif class_label == 5:
-                    final_image[i][j] = c5_color
-                
-    final_image = Image.fromarray(final_image)
+    grid_label_raster = Get_grid_label_raster(sample_image, min_lat, max_lat, min_lon, max_lon, grid_label_mapping)
     
     target_directory = 'Visualization_Results/Class_wise_grid_maps/'+district
-    os.makedirs(target_directory, exist_ok = True)
-    final_image.save(target_directory+'/'+district+'_grid_classes_'+year+'.png')
+    Save_rendered_map(grid_label_raster, grid_class_legend, target_directory+'/'+district+'_grid_classes_'+year+'.png')
     #print('Done plotting grid-classes for ',district,' ',year)
  
 
@@ -115,72 +104,26 @@ def Plot_grid_classes(district, sample_image, min_lat, max_lat, min_lon, max_lon
 This function plots the district image with grid types- Urban, Periurban, and Rural
 '''
 def Plot_grid_types(district, sample_image, min_lat, max_lat, min_lon, max_lon, indicators_dataframe, year):
-    # designate RGB color to each grid class    
-    background_color = [0,0,0] #black
-    rejected_color = [255,255,255] #white
-    urban_color = [150, 40, 27] # Maroon
-    periurban_color = [255, 140, 0] # Dark orange
-        
-    final_image = np.zeros([sample_image.shape[0], sample_image.shape[1], 3], dtype=np.uint8) 
-    
     # Create dictionary of grid number to class label mapping from dataframe
     grid_type_mapping = indicators_dataframe.set_index("Grid_number").to_dict()["Grid_type"]
+    # the urban and periurban grids are drawn with their colors, and all the other grids as rejected
+    legend_values = Get_legend_values(grid_type_legend)
+    grid_label_mapping = { grid_number: legend_values[grid_type] if grid_type in ['Urban', 'PeriUrban'] else legend_values['Rejected']
+                           for grid_number, grid_type in grid_type_mapping.items() }
 
-    # image dimensions in number of grids (of size 0.01 x 0.01 deg)
-    img_height_grids = round( (max_lat - min_lat) * 100.0 ) 
-    img_width_grids = round( (max_lon - min_lon) * 100.0 )
-
-    # grid dimensions in number of pixels
-    grid_height_pix = sample_image.shape[0] / img_height_grids
-    grid_width_pix = sample_image.shape[1] / img_width_grids    
-
-    # Allocating the grid number to each pixel
-    for i in range(final_image.shape[0]):
-        for j in range(final_image.shape[1]):
-            if sample_image[i][j] == 0: # if this pixel is a background pixel
-                final_image[i][j] = background_color
-            else:
-                grid_row = floor( i / grid_height_pix )
-                grid_col = floor( j / grid_width_pix )
-                grid_number = ( grid_col * img_height_grids ) + ( img_height_grids - grid_row -1 )
-                class_label = grid_type_mapping[grid_number]
-                if class_label == 'Urban':
-                    final_image[i][j] = urban_color
-                elif class_label == 'PeriUrban':
-                    final_image[i][j] = periurban_color
-                else:
-                    final_image[i][j] = rejected_color
-                
-    final_image = Image.fromarray(final_image)
+    grid_label_raster = Get_grid_label_raster(sample_image, min_lat, max_lat, min_lon, max_lon, grid_label_mapping)
     
     target_directory = 'Visualization_Results/Grid_type_maps/'+district
-    os.makedirs(target_directory, exist_ok = True)
-    final_image.save(target_directory+'/'+district+'_grid_types_'+year+'.png')
+    Save_rendered_map(grid_label_raster, grid_type_legend, target_directory+'/'+district+'_grid_types_'+year+'.png')
     #print('Done plotting grid-types for ',district,' ',year)
 
 
+'''
+This function plots the colored CBU/CNBU/Changing map of the district image as it is, without the padding of the grids
+'''
 def Plot_CBU_CNBU_Changing_Colored_Maps(district, input_image, output_image_path):
-    # designate RGB color to each pixel class    
-    background_color = [0,0,0] #black
-    cnbu_color = [255,255,255] #white
-    cbu_color = [255, 140, 0] # Dark orange
-    changing_color = [150, 40, 27] # Maroon
-    
-    final_image = np.zeros([sample_image.shape[0], sample_image.shape[1], 3], dtype=np.uint8)
-    
-    for i in range(final_image.shape[0]):
-        for j in range(final_image.shape[1]):
-            if sample_image[i][j] == 0: # if this pixel is a background pixel
-                final_image[i][j] = background_color
-            elif sample_image[i][j] == 65: # if this pixel is CBU pixel
-                final_image[i][j] = cbu_color
-            elif sample_image[i][j] == 130: # if this pixel is CNBU pixel
-                final_image[i][j] = cnbu_color
-            elif sample_image[i][j] == 195: # if this pixel is Changing pixel
-                final_image[i][j] = changing_color
-                
-    final_image = Image.fromarray(final_image)
-    final_image.save(output_image_path)
+    # the CBU, CNBU and Changing pixels are drawn with the colors of the urban maps
+    Save_rendered_map(input_image, CBU_CNBU_Changing_urbanization_legend, output_image_path)
 
 
 '''
@@ -219,7 +162,7 @@ for district in districts:
     CBU_CNBU_Changing_image_output_path = CBU_CNBU_Changing_Colored_folder+"/"+district+"_CBU_CNBU_Changing_Colored.png"
     
     #print('Plotting Colored CBU/CNBU/Changing map for ',district)
-    Plot_CBU_CNBU_Changing_Colored_Maps(district, padded_image, CBU_CNBU_Changing_image_output_path)
+    Plot_CBU_CNBU_Changing_Colored_Maps(district, sample_image, CBU_CNBU_Changing_image_output_path)
     #print('Done!')
 
 print("\n#### Check ",CBU_CNBU_Changing_Colored_folder,", Visualization_Results/Grid_type_maps, and Visualization_Results/Class_wise_grid_maps for resultant images!! ####\n")
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from PIL import Image
+import json
+import os, sys
+
+
+'''
+The BU/NBU maps of all years of a district are stored together as a single cube of shape (years x rows x columns).
+The cube is stored as a .npy file of uint8 values so that it can be memory-mapped, and every stage of change detection
+reads the slice of a year directly from disk instead of decoding the png images again.
+A json file stored next to the cube holds the years, in the order of the slices, and the geotransform of the district.
+'''
+cube_directory = 'Year_stack_cubes'
+
+
+'''
+This function returns the file paths of the cube and its metadata for a district
+'''
+def Get_cube_filepaths(district, cube_directory=cube_directory):
+    district_directory = cube_directory+'/'+district
+    cube_filepath = district_directory+'/'+district+'_BU_NBU_cube.npy'
+    metadata_filepath = district_directory+'/'+district+'_BU_NBU_cube.json'
+    return cube_filepath, metadata_filepath
+
+
+'''
+This function computes the geotransform of a district image using its bounding box.
+The geotransform follows the GDAL convention:
+(longitude of top-left corner, pixel width, 0, latitude of top-left corner, 0, -pixel height)
+Inputs:
+1) district_coordinates_filepath = csv file holding the bounding box of each district
+2) district = name of the district
+3) image_shape = (rows, columns) of the district image
+'''
+def Get_district_geotransform(district_coordinates_filepath, district, image_shape):
+    bounding_box_dataframe = pd.read_csv(district_coordinates_filepath)
+    district_index = np.where( bounding_box_dataframe["District_Name"].values == district )
+    min_lat = float( (bounding_box_dataframe["MinLat"].values)[district_index][0] )
+    max_lat = float( (bounding_box_dataframe["MaxLat"].values)[district_index][0] )
+    min_lon = float( (bounding_box_dataframe["MinLong"].values)[district_index][0] )
+    max_lon = float( (bounding_box_dataframe["MaxLong"].values)[district_index][0] )
+
+    pixel_width = (max_lon - min_lon) / image_shape[1]
+    pixel_height = (max_lat - min_lat) / image_shape[0]
+    return [min_lon, pixel_width, 0.0, max_lat, 0.0, -pixel_height]
+
+
+'''
+This function creates an empty cube on disk for a district and returns it as a writable memory-map.
+The caller fills in one year at a time, so only one image needs to be held in memory.
+Inputs:
+1) district = name of the district
+2) years = list of years in the order of the slices of the cube
+3) image_shape = (rows, columns) of the district image
+4) geotransform = geotransform of the district image
+Output:
+1) cube = writable memory-mapped array of shape (years x rows x columns)
+'''
+def Create_year_stack_cube(district, years, image_shape, geotransform, cube_directory=cube_directory):
+    cube_filepath, metadata_filepath = Get_cube_filepaths(district, cube_directory)
+    os.makedirs(os.path.dirname(cube_filepath), exist_ok = True)
+
+    cube = np.lib.format.open_memmap(cube_filepath, mode='w+', dtype=np.uint8, shape=(len(years), image_shape[0], image_shape[1]))
+    metadata = {"years": [str(year) for year in years], "geotransform": list(geotransform)}
+    with open(metadata_filepath, 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=4)
+    return cube
+
+
+'''
+This function creates the cube of a district from its BU/NBU maps which are already saved as png images.
+Each png image is decoded only once here.
+'''
+def Build_year_stack_cube_from_maps(district, years, maps_directory='BU_NBU_maps', district_coordinates_filepath='district_coordinates.csv', cube_directory=cube_directory):
+    cube = None
+    for year_index, year in enumerate(years):
+        image = np.array( Image.open(maps_directory+'/'+district+'/'+district+'_BU_NBU_'+str(year)+'.png') )
+        if cube is None:
+            geotransform = Get_district_geotransform(district_coordinates_filepath, district, image.shape)
+            cube = Create_year_stack_cube(district, years, image.shape, geotransform, cube_directory)
+        cube[year_index] = image
+    cube.flush()
+    del cube
+
+
+'''
+This function loads the cube of a district as a read-only memory-map.
+Output:
+1) cube = memory-mapped array of shape (years x rows x columns). Slicing a year out of it does not copy any data
+2) cube_years = list of years in the order of the slices of the cube
+3) geotransform = geotransform of the district image
+'''
+def Load_year_stack_cube(district, cube_directory=cube_directory):
+    cube_filepath, metadata_filepath = Get_cube_filepaths(district, cube_directory)
+    cube = np.load(cube_filepath, mmap_mode='r')
+    with open(metadata_filepath) as metadata_file:
+        metadata = json.load(metadata_file)
+    return cube, metadata["years"], metadata["geotransform"]
+
+
+'''
+This function returns the cube of a district holding all the given years.
+If the cube does not exist yet or misses any of the years, it is first built from the BU/NBU png maps.
+'''
+def Get_year_stack_cube(district, years, maps_directory='BU_NBU_maps', district_coordinates_filepath='district_coordinates.csv', cube_directory=cube_directory):
+    cube_filepath, metadata_filepath = Get_cube_filepaths(district, cube_directory)
+    if os.path.isfile(cube_filepath) and os.path.isfile(metadata_filepath):
+        cube, cube_years, geotransform = Load_year_stack_cube(district, cube_directory)
+        if all(str(year) in cube_years for year in years):
+            return cube, cube_years, geotransform
+        del cube
+
+    Build_year_stack_cube_from_maps(district, years, maps_directory, district_coordinates_filepath, cube_directory)
+    return Load_year_stack_cube(district, cube_directory)
+
+
+'''
+This function returns the BU/NBU map of a year from the cube. The map is a view on the cube and is not copied.
+'''
+def Get_year_image(cube, cube_years, year):
+    return cube[ cube_years.index(str(year)) ]
@@ -2,6 +2,7 @@ from PIL import Image
 import numpy as np
 import pandas as pd
 import os, sys
+from Year_stack_cube import Get_district_geotransform, Create_year_stack_cube
 
 # define color coding used in prediction images
 Background = 0
@@ -18,7 +19,9 @@ destination_directory = 'BU_NBU_maps'
 os.makedirs( destination_directory, exist_ok = True )
 
 for district in districts:
-    for year in years:
+    # the BU/NBU maps of all years are also stacked in a memory-mappable cube for the later stages
+    cube = None
+    for year_index, year in enumerate(years):
         image_filename = 'Landcover_Predictions_Using_IndiaSat/'+district+'/'+district+'_prediction_'+year+'.png'
         image = np.array( Image.open(image_filename) )
          
@@ -33,6 +36,13 @@ for district in districts:
 
         image = ( Image.fromarray(image) ).convert("L")
         image.save(destination_directory+'/'+district+'/'+district+'_BU_NBU_'+year+'.png')
+
+        if cube is None:
+            geotransform = Get_district_geotransform('district_coordinates.csv', district, (image.height, image.width))
+            cube = Create_year_stack_cube(district, years, (image.height, image.width), geotransform)
+        cube[year_index] = np.array(image)
+    cube.flush()
+    del cube
     print("BU/NBU Map created for ",district)
     
 print("\n#### Check ",destination_directory," directory for results ####\n")
@@ -0,0 +1,220 @@
+import numpy as np
+from scipy import ndimage
+import matplotlib.pyplot as plt
+import os, sys
+
+
+'''
+This function marks the pixels which lie inside the district and are not on its boundary.
+Using convolution filter, each non-boundary pixel inside the district will have value 9 in the mask
+Input:
+1) relabelled_image = district image with label 0 for background pixels, 1 for BU, and 2 for NBU
+Output:
+1) boundary_vs_non_boundary_mask = the mask with value 9 for each non-boundary pixel
+'''
+def Get_boundary_vs_non_boundary_mask(relabelled_image):
+    background_vs_non_background_image = np.sign(relabelled_image)
+    boundary_identifying_kernel = np.array([[1,1,1],[1,1,1],[1,1,1]])
+    boundary_vs_non_boundary_mask = ndimage.convolve(background_vs_non_background_image, boundary_identifying_kernel, mode='constant', cval=0.0)
+    return boundary_vs_non_boundary_mask
+
+
+'''
+This function creates the CBU/CNBU/Changing map of a district using whole-image masks. Nothing is read or written to disk
+so it can be called repeatedly, for example to sweep over thresholds.
+In the CBU/CNBU/Changing map, we assign
+label 0 to background and boundary pixels
+label 65 (1x65) to CBU pixels
+label 130 (2x65) to CNBU pixels, and
+label 195 (3x65) to Changing pixels
+Inputs:
+1) district_image_base_year = image of the base year with label 0 for background pixels, 1 for BU, and 2 for NBU
+2) cost_raster = cost of the linear regression of each pixel at its (row, column) position, NaN where no regression was applied
+3) threshold = pixels with cost less than or equal to the threshold are constant (CBU/CNBU), others are changing
+4) boundary_vs_non_boundary_mask = mask with value 9 for non-boundary pixels. It is computed from the base year if not given
+Output:
+1) CBU_CNBU_Changing_map = the uint8 map of the district
+2) CBU_pixel_count, CNBU_pixel_count, Changing_pixel_count = number of pixels with each label
+'''
+def Classify_pixel_changes(district_image_base_year, cost_raster, threshold, boundary_vs_non_boundary_mask=None):
+    if boundary_vs_non_boundary_mask is None:
+        boundary_vs_non_boundary_mask = Get_boundary_vs_non_boundary_mask(district_image_base_year)
+
+    classified_pixels = (boundary_vs_non_boundary_mask == 9) & np.isfinite(cost_raster)
+    constant_pixels = classified_pixels & (cost_raster <= threshold)
+    CBU_pixels = constant_pixels & (district_image_base_year == 1)
+    CNBU_pixels = constant_pixels & (district_image_base_year != 1)
+    Changing_pixels = classified_pixels & ~constant_pixels
+
+    CBU_CNBU_Changing_map = np.zeros(cost_raster.shape, dtype=np.uint8)
+    CBU_CNBU_Changing_map[CBU_pixels] = 65
+    CBU_CNBU_Changing_map[CNBU_pixels] = 130
+    CBU_CNBU_Changing_map[Changing_pixels] = 195
+
+    CBU_pixel_count = int(np.count_nonzero(CBU_pixels))
+    CNBU_pixel_count = int(np.count_nonzero(CNBU_pixels))
+    Changing_pixel_count = int(np.count_nonzero(Changing_pixels))
+    return CBU_CNBU_Changing_map, CBU_pixel_count, CNBU_pixel_count, Changing_pixel_count
+
+
+'''
+The CDF of the cost values is built from a histogram with a fixed number of bins starting at cost 0.
+The histogram can be updated with the costs of one tile of pixels at a time, so the memory it needs does not depend
+on the number of pixels. When a cost larger than the histogram range arrives, adjacent bins are merged in pairs and
+the range is doubled, so the number of bins stays the same.
+'''
+
+
+'''
+This function creates an empty histogram of cost values
+Inputs:
+1) number_of_bins = number of bins of the histogram (should be even)
+2) max_cost = upper limit of the initial range of the histogram. Smoothed values lie in [0, 25] for the 5x5 kernel,
+so the mean squared error of a pixel cannot be more than (25/2)^2 = 156.25
+'''
+def Create_cost_histogram(number_of_bins=65536, max_cost=256.0):
+    cost_histogram = {}
+    cost_histogram["counts"] = np.zeros(number_of_bins, dtype=np.int64)
+    cost_histogram["max_cost"] = float(max_cost)
+    cost_histogram["smallest_cost"] = np.inf
+    cost_histogram["largest_cost"] = -np.inf
+    return cost_histogram
+
+
+'''
+This function adds the cost values of a set of pixels to the histogram. NaN values (pixels without regression) are ignored.
+'''
+def Update_cost_histogram(cost_histogram, cost_values):
+    cost_values = np.asarray(cost_values, dtype=np.float64).ravel()
+    cost_values = cost_values[ np.isfinite(cost_values) ]
+    if len(cost_values) == 0:
+        return cost_histogram
+
+    # double the range of the histogram until it holds the largest cost value
+    while cost_values.max() >= cost_histogram["max_cost"]:
+        merged_counts = cost_histogram["counts"].reshape(-1, 2).sum(axis=1)
+        cost_histogram["counts"] = np.concatenate( (merged_counts, np.zeros(len(merged_counts), dtype=np.int64)) )
+        cost_histogram["max_cost"] = 2 * cost_histogram["max_cost"]
+
+    number_of_bins = len(cost_histogram["counts"])
+    bin_width = cost_histogram["max_cost"] / number_of_bins
+    bin_indices = np.clip( (cost_values / bin_width).astype(np.int64), 0, number_of_bins-1 )
+    cost_histogram["counts"] += np.bincount(bin_indices, minlength=number_of_bins)
+    cost_histogram["smallest_cost"] = min(cost_histogram["smallest_cost"], float(cost_values.min()))
+    cost_histogram["largest_cost"] = max(cost_histogram["largest_cost"], float(cost_values.max()))
+    return cost_histogram
+
+
+'''
+This function saves the histogram of cost values as a .npz file
+'''
+def Save_cost_histogram(histogram_filepath, cost_histogram):
+    np.savez(histogram_filepath, **cost_histogram)
+
+
+'''
+This function loads the histogram of cost values saved by Save_cost_histogram
+'''
+def Load_cost_histogram(histogram_filepath):
+    histogram_file = np.load(histogram_filepath)
+    cost_histogram = {}
+    cost_histogram["counts"] = histogram_file["counts"]
+    cost_histogram["max_cost"] = float(histogram_file["max_cost"])
+    cost_histogram["smallest_cost"] = float(histogram_file["smallest_cost"])
+    cost_histogram["largest_cost"] = float(histogram_file["largest_cost"])
+    return cost_histogram
+
+
+'''
+This function returns the CDF of the cost values from the histogram.
+The probability mass of each bin is placed at the left edge of the bin.
+Output:
+1) bin_edges = left edge of each bin
+2) cdf = fraction of cost values lying in the bins up to and including each bin
+'''
+def Get_cost_cdf(cost_histogram):
+    counts = cost_histogram["counts"]
+    bin_edges = np.arange(len(counts)) * ( cost_histogram["max_cost"] / len(counts) )
+    cdf = np.cumsum(counts) / float(counts.sum())
+    return bin_edges, cdf
+
+
+'''
+This function calculates the threshold for the cost value which determines if a pixel is constant (BU/NBU) or changing.
+The threshold is found at the minima of the 2nd derivative of the smoothed CDF of cost values.
+The CDF is read from the histogram instead of the unique cost values, and differs from the exact CDF by at most the
+probability mass of one bin. With the default bins, the threshold matches the one from the exact CDF within one step
+of the 100 points sampled over the range of costs, i.e. within (largest_cost - smallest_cost)/99.
+Inputs:
+1) district = name of the district under analysis (string)
+2) cost_histogram = histogram of the cost (mean squared error) of the linear regression applied on each pixel
+3) plot_directory = if given, the CDF and its derivatives are plotted and saved in this directory
+Output:
+1) threshold = the cost threshold
+'''
+def Find_cost_threshold(district, cost_histogram, plot_directory=None):
+    bin_edges, cdf = Get_cost_cdf(cost_histogram)
+
+    # interpolate the CDF linearly at 100 points between the smallest and the largest cost value
+    x_range = np.linspace(cost_histogram["smallest_cost"], cost_histogram["largest_cost"], 100)
+    y_spline = np.interp(x_range, bin_edges, cdf)
+
+    # Applying convolution filter for a smooth curve
+    kernel_size = 5
+    kernel = [1/kernel_size]*(kernel_size) # this is a list of [1/5, 1/5..., 1/5] 5 times
+    smooth_spline = np.convolve(y_spline, kernel, 'same')
+
+    # removing last 20 points and using only first 80 points because threshold is expected to be found in the very beginning
+    smooth_spline = smooth_spline[:80]
+    x_range = x_range[:80]
+
+    # finding threshold value using 1st and 2nd derivative 
+
+    # 1st derivative
+    dy = np.diff(smooth_spline, 1)	#storing subtractions of each point with previous point
+    dx = np.diff(x_range,1)
+    y_first_derivative = dy/dx			#finding first derivative curve
+    middle_x_first_derivative = 0.5 * (x_range[:-1] + x_range[1:]) #finding middle point where the derivative is calculated
+    
+    # 2nd derivative
+    dy_first_derivative = np.diff(y_first_derivative,1)
+    dx_first_derivative = np.diff(middle_x_first_derivative,1)
+    y_second_derivative = dy_first_derivative / dx_first_derivative
+    middle_x_second_derivative = 0.5*(middle_x_first_derivative[:-1] + middle_x_first_derivative[1:])
+
+    if plot_directory is not None:
+        Plot_cost_threshold_curves(district, bin_edges, cdf, x_range, smooth_spline, middle_x_first_derivative, y_first_derivative, middle_x_second_derivative, y_second_derivative, plot_directory)
+
+    # find minima for the second derivative plot
+    minima_index = np.argmin(y_second_derivative)
+    threshold = 2 + x_range[minima_index]	# adding 2 to the point of minima is experimental
+    
+    return threshold
+
+
+'''
+This function plots the smooth CDF of cost values and its 1st and 2nd derivatives used for finding the threshold.
+Each figure is saved in plot_directory and closed.
+'''
+def Plot_cost_threshold_curves(district, bin_edges, cdf, x_range, smooth_spline, middle_x_first_derivative, y_first_derivative, middle_x_second_derivative, y_second_derivative, plot_directory):
+    os.makedirs(plot_directory, exist_ok = True)
+    occupied_bins = np.diff(cdf, prepend=0.0) > 0
+
+    figure = plt.figure()
+    plt.plot(bin_edges[occupied_bins], cdf[occupied_bins], 'ro', label='data')
+    plt.plot(x_range, smooth_spline)
+    plt.title(district+': smooth spline over CDF')
+    figure.savefig(plot_directory+'/'+district+'_cost_cdf.png')
+    plt.close(figure)
+
+    figure = plt.figure()
+    plt.plot(middle_x_first_derivative, y_first_derivative)
+    plt.title(district+': 1st derivative')
+    figure.savefig(plot_directory+'/'+district+'_cost_cdf_1st_derivative.png')
+    plt.close(figure)
+
+    figure = plt.figure()
+    plt.plot(middle_x_second_derivative, y_second_derivative)
+    plt.title(district+': 2nd derivative')
+    figure.savefig(plot_directory+'/'+district+'_cost_cdf_2nd_derivative.png')
+    plt.close(figure)
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+'''
+The distances on earth are computed on a sphere of radius earth_radius. All the functions take scalars or numpy arrays of
+coordinates in degrees, which are broadcast against each other, so the distances of many pairs of points are found in one call
+(e.g. from one point to all the nodes of a road graph).
+For short distances (up to about a kilometer) the equirectangular approximation, which treats the earth as flat around the points,
+gives the same distance as the Haversine formula to within a few millimeters and is cheaper to compute.
+'''
+earth_radius = 6378100.0 # Radius of earth in meters
+
+
+'''
+This function is used to find the distance in meters between coordinates on earth using Haversine formula
+'''
+def Get_haversine_distance(source_lat, source_lon, dest_lat, dest_lon):
+    # convert all coordinates from degrees to radians
+    source_lat = np.radians(source_lat)
+    source_lon = np.radians(source_lon)
+    dest_lat = np.radians(dest_lat)
+    dest_lon = np.radians(dest_lon)
+
+    # Applying Haversine formula
+    difference_lat = dest_lat - source_lat
+    difference_lon = dest_lon - source_lon
+    a = np.sin(difference_lat/2)**2 + np.cos(source_lat) * np.cos(dest_lat) * np.sin(difference_lon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return c * earth_radius
+
+
+'''
+This function returns the number of meters in one degree of latitude, which is the same at all latitudes
+'''
+def Get_meters_per_degree_lat():
+    return np.radians(1.0) * earth_radius
+
+
+'''
+This function returns the number of meters in one degree of longitude at the given latitudes (in degrees)
+'''
+def Get_meters_per_degree_lon(lat):
+    return np.radians(1.0) * earth_radius * np.cos( np.radians(lat) )
+
+
+'''
+This function is used to find the approximate distance in meters between nearby coordinates using the equirectangular approximation.
+The difference of longitudes is measured at the mean latitude of the two points
+'''
+def Get_equirectangular_distance(source_lat, source_lon, dest_lat, dest_lon):
+    source_lat, source_lon = np.asarray(source_lat), np.asarray(source_lon)
+    dest_lat, dest_lon = np.asarray(dest_lat), np.asarray(dest_lon)
+    x = (dest_lon - source_lon) * Get_meters_per_degree_lon( (source_lat + dest_lat) / 2.0 )
+    y = (dest_lat - source_lat) * Get_meters_per_degree_lat()
+    return np.sqrt(x**2 + y**2)
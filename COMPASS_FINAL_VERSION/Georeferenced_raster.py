@@ -0,0 +1,175 @@
+import numpy as np
+import json
+from math import floor
+import os, sys
+
+
+'''
+A raster is a 2D array of pixel values of a district stored as a .npy file so that it can be memory-mapped.
+Its geotransform is stored in a json file with the same name next to it. The geotransform follows the GDAL convention:
+(longitude of top-left corner, pixel width, 0, latitude of top-left corner, 0, -pixel height)
+'''
+
+
+'''
+This function returns the path of the json file holding the geotransform of a raster
+'''
+def Get_raster_metadata_filepath(raster_filepath):
+    return os.path.splitext(raster_filepath)[0]+'.json'
+
+
+'''
+This function saves a raster along with its geotransform
+Inputs:
+1) raster_filepath = path of the .npy file of the raster
+2) raster = 2D array of pixel values
+3) geotransform = geotransform of the raster
+4) extra_metadata = dictionary of any other information to be stored with the raster, such as years
+'''
+def Save_raster(raster_filepath, raster, geotransform, extra_metadata=None):
+    os.makedirs(os.path.dirname(raster_filepath) or '.', exist_ok = True)
+    np.save(raster_filepath, raster)
+    Save_raster_metadata(raster_filepath, raster.shape, raster.dtype, geotransform, extra_metadata)
+
+
+'''
+This function saves the json file holding the shape, data type, geotransform and any extra metadata of a raster
+'''
+def Save_raster_metadata(raster_filepath, raster_shape, raster_dtype, geotransform, extra_metadata=None):
+    metadata = {"shape": list(raster_shape), "dtype": str(np.dtype(raster_dtype)), "geotransform": list(geotransform)}
+    if extra_metadata is not None:
+        metadata.update(extra_metadata)
+    with open(Get_raster_metadata_filepath(raster_filepath), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=4)
+
+
+'''
+This function creates a raster of zeros on disk and returns it as a writable memory-map,
+so that a raster larger than the memory can be filled in one tile at a time
+Inputs:
+1) raster_filepath = path of the .npy file of the raster
+2) raster_shape = shape of the raster
+3) raster_dtype = data type of the raster
+4) geotransform = geotransform of the raster
+5) extra_metadata = dictionary of any other information to be stored with the raster, such as years
+'''
+def Create_raster(raster_filepath, raster_shape, raster_dtype, geotransform, extra_metadata=None):
+    os.makedirs(os.path.dirname(raster_filepath) or '.', exist_ok = True)
+    raster = np.lib.format.open_memmap(raster_filepath, mode='w+', dtype=raster_dtype, shape=tuple(raster_shape))
+    Save_raster_metadata(raster_filepath, raster_shape, raster_dtype, geotransform, extra_metadata)
+    return raster
+
+
+'''
+This function moves a raster and its json file to a new path, replacing any raster already present there
+'''
+def Replace_raster(source_raster_filepath, destination_raster_filepath):
+    os.replace(source_raster_filepath, destination_raster_filepath)
+    os.replace(Get_raster_metadata_filepath(source_raster_filepath), Get_raster_metadata_filepath(destination_raster_filepath))
+
+
+'''
+This function loads a raster as a read-only memory-map. The pixels are read from disk only when they are indexed.
+Output:
+1) raster = memory-mapped 2D array of pixel values, indexed by (row, column)
+2) geotransform = geotransform of the raster
+'''
+def Load_raster(raster_filepath):
+    raster = np.load(raster_filepath, mmap_mode='r')
+    metadata = Load_raster_metadata(raster_filepath)
+    return raster, metadata["geotransform"]
+
+
+'''
+This function returns all the information stored with a raster, including its geotransform
+'''
+def Load_raster_metadata(raster_filepath):
+    with open(Get_raster_metadata_filepath(raster_filepath)) as metadata_file:
+        metadata = json.load(metadata_file)
+    return metadata
+
+
+'''
+The grids of a district are of size 0.01 x 0.01 deg, so the bounding box of the district image is rounded off to fit all the grids.
+The pixels between the tight bounding box and the rounded bounding box are background pixels. Instead of inserting these rows
+and columns in the image, they are described by a padding (top_rows, bottom_rows, left_columns, right_columns), which is
+stored as metadata of the image. A window of the padded image is read directly from the original image, and only the
+pixels of the window are copied.
+'''
+
+
+'''
+This function returns the padding of an image to fit the rounded bounding box
+Inputs:
+1) image_shape = (rows, columns) of the image
+2) min_lat, max_lat, min_lon, max_lon: Original tight bounding box
+3) rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon: Rounded off bounding box
+4) rounding = function used to round the number of rows and columns to an integer (floor or ceil)
+Output:
+1) padding = (top_rows, bottom_rows, left_columns, right_columns)
+'''
+def Get_padding(image_shape, min_lat, max_lat, min_lon, max_lon, rounded_min_lat, rounded_max_lat, rounded_min_lon, rounded_max_lon, rounding=floor):
+    # since (max_coordinate - min_coordinate) = #row/column pixels, thus using unitary method
+    top_rows = rounding( image_shape[0] * ( (rounded_max_lat - max_lat) / (max_lat - min_lat) ) )
+    bottom_rows = rounding( image_shape[0] * ( (min_lat - rounded_min_lat) / (max_lat - min_lat) ) )
+    left_columns = rounding( image_shape[1] * ( (min_lon - rounded_min_lon) / (max_lon - min_lon) ) )
+    right_columns = rounding( image_shape[1] * ( (rounded_max_lon - max_lon) / (max_lon - min_lon) ) )
+    return max(0, int(top_rows)), max(0, int(bottom_rows)), max(0, int(left_columns)), max(0, int(right_columns))
+
+
+'''
+This function returns the (rows, columns) of the padded image
+'''
+def Get_padded_shape(image_shape, padding):
+    top_rows, bottom_rows, left_columns, right_columns = padding
+    return ( image_shape[0] + top_rows + bottom_rows, image_shape[1] + left_columns + right_columns )
+
+
+'''
+This function returns the geotransform of the padded image, whose top-left corner is moved up and left by the padding
+'''
+def Get_padded_geotransform(geotransform, padding):
+    top_rows, bottom_rows, left_columns, right_columns = padding
+    padded_geotransform = list(geotransform)
+    padded_geotransform[0] = geotransform[0] - left_columns * geotransform[1]
+    padded_geotransform[3] = geotransform[3] - top_rows * geotransform[5]
+    return padded_geotransform
+
+
+'''
+This function reads a window of the padded image from the original image. Only the pixels of the window are copied,
+and the pixels of the window which lie in the padding get the background value.
+Inputs:
+1) raster = original (unpadded) image
+2) padding = (top_rows, bottom_rows, left_columns, right_columns)
+3) window = pair of (row, column) slices in the padded image. By default, the whole padded image
+4) fill_value = value of the padded pixels
+Output:
+1) padded_window = array of the same data type as the raster
+'''
+def Get_padded_window(raster, padding, window=None, fill_value=0):
+    padded_shape = Get_padded_shape(raster.shape, padding)
+    if window is None:
+        window = ( slice(0, padded_shape[0]), slice(0, padded_shape[1]) )
+    row_start, row_stop, _ = window[0].indices(padded_shape[0])
+    column_start, column_stop, _ = window[1].indices(padded_shape[1])
+    top_rows, bottom_rows, left_columns, right_columns = padding
+
+    padded_window = np.full( (max(0, row_stop-row_start), max(0, column_stop-column_start)) + raster.shape[2:], fill_value, dtype=raster.dtype )
+    # the part of the window which overlaps the original image, in the coordinates of the original image
+    overlap_row_start = max(row_start - top_rows, 0)
+    overlap_row_stop = min(row_stop - top_rows, raster.shape[0])
+    overlap_column_start = max(column_start - left_columns, 0)
+    overlap_column_stop = min(column_stop - left_columns, raster.shape[1])
+    if overlap_row_start < overlap_row_stop and overlap_column_start < overlap_column_stop:
+        padded_window[ overlap_row_start + top_rows - row_start : overlap_row_stop + top_rows - row_start,
+                       overlap_column_start + left_columns - column_start : overlap_column_stop + left_columns - column_start ] = \
+            raster[overlap_row_start:overlap_row_stop, overlap_column_start:overlap_column_stop]
+    return padded_window
+
+
+'''
+This function returns the whole padded image as a single copy of the same data type as the original image
+'''
+def Pad_raster(raster, padding, fill_value=0):
+    return Get_padded_window(raster, padding, None, fill_value)
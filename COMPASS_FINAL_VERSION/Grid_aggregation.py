@@ -0,0 +1,135 @@
+import numpy as np
+from collections import namedtuple
+from fractions import Fraction
+from math import ceil, floor
+
+
+'''
+A district image is padded to a bounding box rounded to the unit grids of size 0.01 x 0.01 deg. The grids are numbered from the
+bottom left of the district, as if the image was rotated by 90 deg in clockwise direction: the grid rows are along the columns of
+the image (longitudes) and the grid columns along the rows of the image counted from the bottom row (latitudes).
+With grid_rows x grid_cols unit grids over the rotated image of rows x columns pixels, the grid (grid_i, grid_j) covers the rotated
+pixel rows floor(rows*grid_i/grid_rows) to floor(rows*(grid_i+1)/grid_rows)-1 and similarly the rotated pixel columns, and its number
+is (grid_i * grid_cols) + grid_j.
+Grids of other sizes (e.g. 0.005, 0.02 or 0.05 deg) are laid out in the same way on the unit grids. When the grid size does not
+divide the district, the last grid along the rows (columns) covers only the remaining unit grids.
+The edges of the grids of all the sizes divide the image into cells, and the grid of any size is a rectangle of these cells.
+Each pixel is given its cell, and the pixels of each label are counted for all the cells together with a bincount on the combined
+(cell, label) key. The image is not rotated: it is read in strips of its rows, so a raster memory-mapped from disk is read in order
+and only one strip is held in memory. A summed-area table of each label over the cells then gives the pixels of a label in
+any grid from the 4 corners of the grid.
+'''
+unit_grid_size = 0.01 # size of the grids in degrees to which the district bounding box is rounded
+aggregation_strip_pixels = 2**22 # number of pixels of a label raster counted at a time
+
+'''
+The summed-area table of each label over the cells of an image
+1) table = array of shape ((number_of_labels + 1) x (cell rows + 1) x (cell columns + 1)) where table[label, i, j] is
+the number of pixels of the label in the cell rows 0 to i-1 and the cell columns 0 to j-1
+2) row_edges, col_edges = pixel edges of the cells along the grid rows and the grid columns
+'''
+Label_summed_area_table = namedtuple('Label_summed_area_table', ['table', 'row_edges', 'col_edges'])
+
+
+'''
+This function returns the pixel edges of the grids along one axis of the image.
+The grid k covers the pixels from edges[k] up to edges[k+1]-1
+Inputs:
+1) number_of_pixels = number of pixels of the image along the axis
+2) number_of_unit_grids = number of unit grids (0.01 deg) along the axis
+3) grid_size = size of the grids in degrees
+'''
+def Get_grid_pixel_edges(number_of_pixels, number_of_unit_grids, grid_size=unit_grid_size):
+    # the edges are computed with fractions, so the unit grids get exactly floor(number_of_pixels*k/number_of_unit_grids)
+    unit_grids_per_grid = Fraction(str(grid_size)) / Fraction(str(unit_grid_size))
+    number_of_grids = ceil(number_of_unit_grids / unit_grids_per_grid)
+    grid_edges = [ min(k * unit_grids_per_grid, number_of_unit_grids) for k in range(number_of_grids + 1) ]
+    return np.array([ floor(number_of_pixels * grid_edge / number_of_unit_grids) for grid_edge in grid_edges ], dtype=np.int64)
+
+
+'''
+This function returns the pixel edges of the cells along one axis of the image, which are the edges of the grids of all the sizes
+'''
+def Get_cell_pixel_edges(number_of_pixels, number_of_unit_grids, grid_sizes=(unit_grid_size,)):
+    return np.unique( np.concatenate([ Get_grid_pixel_edges(number_of_pixels, number_of_unit_grids, grid_size) for grid_size in grid_sizes ]) )
+
+
+'''
+This function returns the cell of every pixel along one axis of the image
+'''
+def Get_pixel_cells(number_of_pixels, cell_edges):
+    # searchsorted finds, for every pixel, the cell whose edges contain it
+    return np.searchsorted(cell_edges, np.arange(number_of_pixels), side='right') - 1
+
+
+'''
+This function counts the pixels of each label in every cell of an image, reading the image in strips of rows
+Inputs:
+1) label_raster = image (not rotated) with integer labels 0,1,...,(number_of_labels - 1), e.g. memory-mapped from disk
+2) row_edges = pixel edges of the cells along the grid rows, i.e. the columns of the image
+3) col_edges = pixel edges of the cells along the grid columns, i.e. the rows of the image from the bottom row
+4) number_of_labels = number of labels counted separately. Pixels with any other value are counted in an extra last label
+5) strip_pixels = number of pixels read at a time
+Output:
+1) cell_label_counts = array of shape (cell rows x cell columns x (number_of_labels + 1)) with the number of pixels of each label in each cell
+'''
+def Count_cell_labels(label_raster, row_edges, col_edges, number_of_labels=4, strip_pixels=aggregation_strip_pixels):
+    rows, columns = label_raster.shape
+    cell_rows, cell_cols = len(row_edges) - 1, len(col_edges) - 1
+    # the cell number of a pixel is (cell row of its column * cell_cols) + cell column of its row counted from the bottom
+    column_cell_numbers = Get_pixel_cells(columns, row_edges) * cell_cols
+    row_cell_numbers = Get_pixel_cells(rows, col_edges)[::-1]
+
+    cell_label_counts = np.zeros( cell_rows * cell_cols * (number_of_labels + 1), dtype=np.int64 )
+    strip_rows = max(1, strip_pixels // max(columns, 1))
+    for row_start in range(0, rows, strip_rows):
+        row_stop = min(row_start + strip_rows, rows)
+        labels = np.asarray(label_raster[row_start:row_stop]).astype(np.int64)
+        labels[ (labels < 0) | (labels >= number_of_labels) ] = number_of_labels
+        cell_keys = ( row_cell_numbers[row_start:row_stop, None] + column_cell_numbers[None, :] ) * (number_of_labels + 1) + labels
+        cell_label_counts += np.bincount(cell_keys.reshape(-1), minlength = len(cell_label_counts))
+    return cell_label_counts.reshape(cell_rows, cell_cols, number_of_labels + 1)
+
+
+'''
+This function builds the summed-area table of each label over the cells of an image
+Inputs:
+1) cell_label_counts = number of pixels of each label in each cell, from Count_cell_labels
+2) row_edges, col_edges = pixel edges of the cells along the grid rows and the grid columns
+Output:
+1) summed_area_table = Label_summed_area_table of the image
+'''
+def Get_label_summed_area_table(cell_label_counts, row_edges, col_edges):
+    table = np.zeros( (cell_label_counts.shape[2], cell_label_counts.shape[0] + 1, cell_label_counts.shape[1] + 1), dtype=np.int64 )
+    table[:, 1:, 1:] = np.moveaxis(cell_label_counts, -1, 0).cumsum(axis=1).cumsum(axis=2)
+    return Label_summed_area_table(table, np.asarray(row_edges), np.asarray(col_edges))
+
+
+'''
+This function counts the pixels of each label in every grid from the summed-area table of an image
+Inputs:
+1) summed_area_table = table of the image from Get_label_summed_area_table, with the grid size among the sizes of its cells
+2) number_of_unit_rows, number_of_unit_cols = number of unit grids (0.01 deg) along the grid rows and the grid columns
+3) grid_size = size of the grids in degrees
+Output:
+1) grid_label_counts = array of shape (grids x (number_of_labels + 1)) with the number of pixels of each label in each grid,
+in the order of the grid numbers
+2) grid_rows, grid_cols = number of grids along the rows and the columns of the rotated image
+'''
+def Count_grid_labels_in_summed_area_table(summed_area_table, number_of_unit_rows, number_of_unit_cols, grid_size=unit_grid_size):
+    table, cell_row_edges, cell_col_edges = summed_area_table
+    row_edges = Get_grid_pixel_edges(int(cell_row_edges[-1]), number_of_unit_rows, grid_size)
+    col_edges = Get_grid_pixel_edges(int(cell_col_edges[-1]), number_of_unit_cols, grid_size)
+    # position of the grid edges among the cell edges, i.e. the corners of the grids in the table
+    corner_rows = np.searchsorted(cell_row_edges, row_edges)
+    corner_cols = np.searchsorted(cell_col_edges, col_edges)
+    if not ( np.array_equal(cell_row_edges[np.minimum(corner_rows, len(cell_row_edges) - 1)], row_edges) and
+             np.array_equal(cell_col_edges[np.minimum(corner_cols, len(cell_col_edges) - 1)], col_edges) ):
+        raise ValueError("The grids of size "+str(grid_size)+" are not made of the cells of the summed-area table")
+    grid_rows, grid_cols = len(row_edges) - 1, len(col_edges) - 1
+
+    # value of the table at the corners of all grids, then the count of each grid from its 4 corners
+    corners = table[:, corner_rows][:, :, corner_cols]
+    counts = corners[:, 1:, 1:] - corners[:, :-1, 1:] - corners[:, 1:, :-1] + corners[:, :-1, :-1]
+    grid_label_counts = np.moveaxis(counts, 0, -1).reshape(grid_rows * grid_cols, table.shape[0])
+    return grid_label_counts, grid_rows, grid_cols
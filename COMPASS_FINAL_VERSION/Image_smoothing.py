@@ -0,0 +1,77 @@
+import numpy as np
+from scipy import ndimage
+
+
+'''
+The smoothing of BU/NBU maps is applied to a stack of years (years x rows x columns) in one call.
+Both filters only act along the rows and columns, so the years of the stack never mix with each other.
+The 2D box kernel of the convolution is applied as two 1D passes, and the gaussian filter is applied on the result.
+All the passes write into two float buffers which can be passed in again, so smoothing the same stack with different
+kernel sizes and sigmas (e.g. to sweep the hyper-parameters) neither reloads the images nor allocates new arrays.
+'''
+default_kernel_size = 5
+default_sigma = 0.2
+default_truncate = 11.0
+
+
+'''
+This function returns the number of pixels on each side of a pixel which affect its smoothed value,
+i.e. the radius of the box kernel plus the radius of the gaussian filter. It is the halo needed for smoothing in tiles.
+'''
+def Get_smoothing_halo(kernel_size=default_kernel_size, sigma=default_sigma, truncate=default_truncate):
+    return kernel_size//2 + int(truncate * sigma + 0.5)
+
+
+'''
+This function prepares the stack of BU/NBU maps for the application of smoothing filters.
+The background and builtup pixels are given value 0 and the non-built-up pixels are given value 1.
+This is because the filters should perform smoothing over BU and NBU pixels only and not background.
+Inputs:
+1) cube = stack of BU/NBU maps (years x rows x columns) with background pixels having value 0, BU pixels 65, and NBU 130
+2) year_indices = indices of the years of the cube to be prepared. By default, all the years are prepared
+Output:
+1) prepped_stack = uint8 stack of the selected years with NBU pixels having value 1 and the other pixels 0
+'''
+def Prepare_year_stack_for_filters(cube, year_indices=None):
+    if year_indices is None:
+        year_indices = range(cube.shape[0])
+    prepped_stack = np.array(cube[list(year_indices)], dtype=np.uint8)
+    prepped_stack //= 130
+    return prepped_stack
+
+
+'''
+This function returns a pair of float buffers which can be reused for smoothing stacks of the given shape
+'''
+def Create_smoothing_buffers(stack_shape):
+    return np.empty(stack_shape, dtype=np.float64), np.empty(stack_shape, dtype=np.float64)
+
+
+'''
+This function applies the convolution and gaussian filters on every year of a prepared stack.
+For each year, the result is the same as
+ndimage.gaussian_filter( ndimage.convolve(prepped_image, np.ones((kernel_size, kernel_size)), mode='constant', cval=0.0),
+                         sigma=sigma, truncate=truncate, output=float )
+All filter parameters are hyper-parameters.
+Inputs:
+1) prepped_stack = stack returned by Prepare_year_stack_for_filters
+2) kernel_size = size of the square convolution kernel of ones
+3) sigma, truncate = parameters of the gaussian filter along the rows and columns
+4) smoothing_buffers = pair of float64 arrays of the shape of the stack, from Create_smoothing_buffers. They are created if not given
+Output:
+1) smoothed_stack = float64 stack of smoothed images. It is the second of the smoothing buffers, so it is overwritten when
+the buffers are used again
+'''
+def Smooth_year_stack(prepped_stack, kernel_size=default_kernel_size, sigma=default_sigma, truncate=default_truncate, smoothing_buffers=None):
+    if smoothing_buffers is None:
+        smoothing_buffers = Create_smoothing_buffers(prepped_stack.shape)
+    box_buffer, smoothed_stack = smoothing_buffers
+
+    # the box kernel of ones is separable, so the 2D convolution is a convolution along the columns followed by the rows
+    box_kernel = np.ones(kernel_size)
+    ndimage.convolve1d(prepped_stack, box_kernel, axis=2, output=box_buffer, mode='constant', cval=0.0)
+    ndimage.convolve1d(box_buffer, box_kernel, axis=1, output=box_buffer, mode='constant', cval=0.0)
+
+    # sigma 0 along the years keeps the years of the stack separate
+    ndimage.gaussian_filter(box_buffer, sigma=(0, sigma, sigma), truncate=truncate, output=smoothed_stack)
+    return smoothed_stack
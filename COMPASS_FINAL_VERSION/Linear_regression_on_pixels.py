@@ -4,122 +4,133 @@ from pylab import *
 from PIL import Image
 from scipy import ndimage
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
+from Pixel_regression import regression_statistics_names, Create_regression_statistics, Update_regression_statistics, Get_regression_from_statistics
+from Year_stack_cube import Get_year_stack_cube, Get_available_years
+from Georeferenced_raster import Create_raster, Replace_raster, Load_raster, Load_raster_metadata
+from Change_classification import Get_boundary_vs_non_boundary_mask, Create_cost_histogram, Update_cost_histogram, Save_cost_histogram, Get_cost_cdf
+from Image_smoothing import Get_smoothing_halo, Prepare_year_stack_for_filters, Smooth_year_stack
+from Tiled_execution import Get_tiles
+from Parallel_execution import Run_in_parallel
 import os, sys
 
 districts = ['Bangalore', 'Chennai', 'Delhi', 'Gurgaon', 'Hyderabad', 'Kolkata', 'Mumbai']
-years = ['2016', '2017', '2018', '2019']
+# number of processes used to run the districts in parallel. None uses all the cores and 1 runs the districts one after another
+number_of_workers = None
+# the district is processed in tiles of tile_size x tile_size pixels so that the memory needed does not depend on its size
+# None processes the whole district as a single tile
+tile_size = 1024
+# The years are not fixed. All the years for which a BU/NBU map of the district is present are used.
+# The sufficient statistics of the regression of each pixel are saved after every run, so when the map of a new year
+# is added, only the new year is smoothed and added to the regression of each pixel.
 
 # defining required functions here
 '''
-This function is used to prepare district image for the application of smoothing filters. 
-The background and builtup pixels are given value 0 and the non-built-up pixels are given value 1.
-This is because the filters should perform smoothing over BU and NBU pixels only and not background.
-
-Input:
-a) original_image: The BU/NBU maps with background pixels having value 0, BU pixels having value 65, and NBU value 130 
-
-Output:
-a) prepped_image: The Background and BU pixels will have value 0 and NBU pixels will have value 1. 
+This function returns the input variable of the regression for a year.
+The years are counted from the base (first) year of the district, so for consecutive years it is 0,1,...,(number of years - 1)
 '''
-def Prepare_image_for_filters(original_image):
-    prepped_image = original_image//130
-    return prepped_image
+def Get_year_value(year, base_year):
+    return float( int(year) - int(base_year) )
 
 
 '''
-This function removes the background pixels from the 1D array of the smoothed image using original image.
-A pixel is retained in the smoothed array only if it's value in original image is either 1 (for BU) or 2 (for NBU)
+This function applies linear regression on the pixels of a district over all its years and saves the sufficient statistics,
+the cost, slope and intercept rasters, the histogram of cost values and the CDF plot of the district
 '''
-def Remove_background_pixels(original_1D_image, smoothed_1D_image):    
-    smooth_temp = [ smoothed_1D_image[i] for i in range(len(smoothed_1D_image)) if original_1D_image[i] > 0]
-    return smooth_temp
+def Regress_district(district):
+    print (district)
+    years = Get_available_years('BU_NBU_maps', district, 'BU_NBU')
+    cube, cube_years, geotransform = Get_year_stack_cube(district, years)
+    result_prefix = 'Cost_results_from_Regression/'+district+'/'+district+'_regression_'
+    statistics_filepath = result_prefix+'statistics.npy'
 
+    # load the sufficient statistics of the years which are already added to the regression, if any
+    if os.path.isfile(statistics_filepath):
+        regression_statistics = Load_raster(statistics_filepath)[0]
+        statistics_metadata = Load_raster_metadata(statistics_filepath)
+        regressed_years = statistics_metadata["years"]
+        base_year = statistics_metadata["base_year"]
+    else:
+        regression_statistics = None
+        regressed_years = []
+        base_year = years[0]
 
-'''
-Driver code starts here
-'''
-for district in districts:
-    print (district)
-    year_to_pixel_matrix = [] # this matrix stores for each year the value of all pixels 
-    
-    for year in years:
-        original_image = np.array( Image.open('BU_NBU_maps/'+district+'/'+district+'_BU_NBU_'+year+'.png') )
-        prepped_image_for_filters = Prepare_image_for_filters(original_image)
-    
-        # Apply Convolution and gaussian filters over prepped image. All filter parameters are hyper-parameters
-        
-        kernel = np.array([[1,1,1,1,1],[1,1,1,1,1],[1,1,1,1,1],[1,1,1,1,1],[1,1,1,1,1]])
-        smoothed_image = ndimage.convolve( prepped_image_for_filters, kernel, mode='constant', cval=0.0)
-        smoothed_image = ndimage.gaussian_filter(smoothed_image, sigma=0.2, truncate=11.0, output=float) 
-        
-        # convert the 2D images into 1D arrays for further pixel-wise processing
-        original_1D_image = original_image.flatten()
-        smoothed_1D_image = smoothed_image.flatten()
-        assert(len(original_1D_image) == len(smoothed_1D_image))
-        
-        smoothed_1D_image = Remove_background_pixels(original_1D_image, smoothed_1D_image)
-        year_to_pixel_matrix.append(smoothed_1D_image) 
-    
-    # transpose is taken to store pixel values in rows against the years in columns
-    pixel_to_year_matrix = np.array(year_to_pixel_matrix, copy=False).T
-
-    # Applying linear regression on the values of each pixel over differen years i.e each row of pixel_to_year_matrix
-    # For this, the boundary pixels of a district should be avoided as their smooth value is impacted by background pixels
-        
-    relabelled_original_image = original_image//65  # 0 for background, 1 for BU, and 2 for NBU
-    dimensions = relabelled_original_image.shape
-    
-    background_vs_non_background_image = np.sign(relabelled_original_image) # using signum function, background pixels remain 0 and non-background become 1
-    
-    # using convolution filter, each non-boundary pixel inside the district will have value 9 in the mask
-    boundary_identifying_kernel = np.array([[1,1,1],[1,1,1],[1,1,1]]) # this should be a 5x5 filter but we'll loose out on double boundary pixels 
-    boundary_vs_non_boundary_mask = ndimage.convolve(background_vs_non_background_image, boundary_identifying_kernel, mode='constant', cval=0.0)
-    
-    current_pixel = 0  # refers to current pixel position we check for being boundary pixel or not
-    
-    # Define variables for applying linear regression 
-    year_list_as_input = np.reshape(range(len(years)), (-1,1)) # matrix of type [[1],[2],...,[len(year)]], -1 refers to unspecified no. of rows here
-    # following values are found corresponding to each pixel using its value in all years
-    slope = []
-    intercept = []
-    cost_array = []
-    
-    for j in range(dimensions[0]):
-        for k in range(dimensions[1]):
-            if (background_vs_non_background_image[j][k]): # if pixel is inside the district
-                if (boundary_vs_non_boundary_mask[j][k] == 9): # if pixel is not boundary pixel 
-                    linear_model = LinearRegression() 
-                    # we predict value of pixel for a given year and find best fit of linear regression on it 
-                    # so year_list_as_input is our input variable for linear regression
-                    regression = linear_model.fit(year_list_as_input, pixel_to_year_matrix[current_pixel])
-                    cost = np.mean((pixel_to_year_matrix[current_pixel] - linear_model.predict(year_list_as_input))**2)
-                    cost_array.append(cost)
-                    slope.append(round(regression.coef_[0], 4)) #coef.shape is (1,1)
-                    intercept.append(round(regression.intercept_, 4)) #intercept.shape is (1)
-                current_pixel += 1
-                
-    cost_array = np.array(cost_array)
-    print(cost_array)
-
-    # Save the cost array
-    os.makedirs('Cost_results_from_Regression/'+district, exist_ok = True)
-    # multiply each cost value by 1000 to overcome data loss from storing small values
-    np.savetxt('Cost_results_from_Regression/'+district+'/'+district+'_regression_cost_array.txt', cost_array*1000, fmt='%d')	
+    new_years = [year for year in years if year not in regressed_years]
+    if len(new_years) > 0:
+        print('Adding ', new_years, ' to the regression')
+    new_year_indices = [cube_years.index(year) for year in new_years]
+    last_year_index = cube_years.index(years[-1])
+
+    # the statistics and results are written to disk one tile at a time. The updated statistics are written to a new file
+    # which replaces the old one only after all tiles are done, so an interrupted run does not add a year twice
+    image_shape = cube.shape[1:]
+    updated_statistics_filepath = result_prefix+'statistics_updated.npy'
+    updated_regression_statistics = Create_raster(updated_statistics_filepath, (len(regression_statistics_names),)+image_shape, np.float64, geotransform, {"years": sorted(regressed_years + new_years), "base_year": base_year})
+    result_rasters = {}
+    for result_name in ['cost', 'slope', 'intercept']:
+        result_rasters[result_name] = Create_raster(result_prefix+result_name+'.npy', image_shape, np.float32, geotransform)
+    cost_histogram = Create_cost_histogram()
+
+    # the halo covers the smoothing filters, and the boundary identifying kernel of radius 1
+    halo = max( Get_smoothing_halo(kernel_size=5, sigma=0.2, truncate=11.0), 1 )
+    for window, core, core_in_window in Get_tiles(image_shape, tile_size, halo):
+        if regression_statistics is None:
+            tile_statistics = Create_regression_statistics( cube[0][core].shape )
+        else:
+            tile_statistics = np.array( regression_statistics[(slice(None),)+core] )
+
+        if len(new_years) > 0:
+            # Apply Convolution and gaussian filters over the window of all new years in one go. All filter parameters are hyper-parameters
+            cube_window = cube[(slice(None),)+window]
+            prepped_stack_for_filters = Prepare_year_stack_for_filters(cube_window, new_year_indices)
+            smoothed_stack = Smooth_year_stack(prepped_stack_for_filters, kernel_size=5, sigma=0.2, truncate=11.0)
+
+            for year, year_index, smoothed_window in zip(new_years, new_year_indices, smoothed_stack):
+                original_image = cube_window[year_index][core_in_window]
+                # only the non-background pixels i.e. BU (65) and NBU (130) pixels of this year are added to the regression
+                Update_regression_statistics(tile_statistics, smoothed_window[core_in_window], original_image > 0, Get_year_value(year, base_year))
+        updated_regression_statistics[(slice(None),)+core] = tile_statistics
+
+        # Applying linear regression on the values of each pixel over different years
+        # For this, the boundary pixels of a district should be avoided as their smooth value is impacted by background pixels
+        relabelled_original_image = cube[last_year_index][window]//65  # 0 for background, 1 for BU, and 2 for NBU
+        # using convolution filter, each non-boundary pixel inside the district will have value 9 in the mask
+        boundary_vs_non_boundary_mask = Get_boundary_vs_non_boundary_mask(relabelled_original_image)
+        regression_pixels = (boundary_vs_non_boundary_mask[core_in_window] == 9)
+
+        # the best fit line of each pixel is found from its sufficient statistics
+        slope, intercept, cost = Get_regression_from_statistics(tile_statistics)
+
+        # Save the cost, slope and intercept as rasters of the district image, indexed by (row, column) of the pixel
+        # the boundary and background pixels have no regression and are stored as NaN
+        for result_name, result_tile in [('cost', cost), ('slope', slope), ('intercept', intercept)]:
+            result_tile[~regression_pixels] = np.nan
+            result_rasters[result_name][core] = result_tile
+
+        # the histogram of cost values is saved for finding the threshold of the change classifier
+        Update_cost_histogram(cost_histogram, cost[regression_pixels])
+
+    for result_name in result_rasters:
+        result_rasters[result_name].flush()
+    result_rasters.clear()
+    updated_regression_statistics.flush()
+    del updated_regression_statistics, regression_statistics
+    Replace_raster(updated_statistics_filepath, statistics_filepath)
+    Save_cost_histogram(result_prefix+'cost_histogram.npz', cost_histogram)
 
     # creating and saving CDFs against the cost values of pixels for each district
-    unique_cost_values, cost_frequencies = np.unique(cost_array, return_counts=True)
-    total_cost_values = (float) (cost_frequencies.sum())
-    cost_frequencies = cost_frequencies/total_cost_values
-    cdf = np.cumsum(cost_frequencies)
-    plt.plot(unique_cost_values,cdf,label = 'data')
+    cost_bin_edges, cdf = Get_cost_cdf(cost_histogram)
+    occupied_bins = cost_histogram["counts"] > 0
+    plt.plot(cost_bin_edges[occupied_bins], cdf[occupied_bins], label = 'data')
     # check if a CDF file already exists, since matplotlib doesn't overwrite, delete previous file
     if os.path.isfile('Cost_results_from_Regression/'+district+'/'+district+'_linear_regression_cdf'):
         os.remove('Cost_results_from_Regression/'+district+'/'+district+'_linear_regression_cdf')
     savefig('Cost_results_from_Regression/'+district+'/'+district+'_linear_regression_cdf')
     plt.clf()
-                
-                
-print("Done")
 
 
+'''
+Driver code starts here
+'''
+if __name__ == '__main__':
+    Run_in_parallel(Regress_district, [(district,) for district in districts], number_of_workers)
+    print("Done")
@@ -0,0 +1,98 @@
+import numpy as np
+from PIL import Image
+import os, sys
+
+
+'''
+A map is rendered from a label raster (uint8 values) and a legend. The legend lists the (label value, name, RGB color) of each label,
+so that all the plots of a kind of map share the same colors. The colors of all 256 values are kept in a lookup table, and
+the raster is colored with a single lookup-table index instead of painting the pixels one by one. The pixels with a value which
+is not in the legend are black.
+By default the maps are saved as palettized ("P" mode) PNG images, which store the label value of each pixel along with the colors
+of the legend. They are smaller than RGB images, and give the same colors when opened with Image.open(...).convert("RGB").
+'''
+U_PU_R_legend = [ (0, 'Background', (0, 0, 0)),         # black
+                  (1, 'Urban', (150, 40, 27)),          # maroon
+                  (2, 'PeriUrban', (255, 140, 0)),      # darkorange
+                  (3, 'Rural', (255, 255, 255)) ]       # white
+
+CBU_CNBU_Changing_legend = [ (0, 'Background', (0, 0, 0)),        # black
+                             (65, 'CBU', (160, 160, 160)),        # gray
+                             (130, 'CNBU', (0, 255, 0)),          # green
+                             (195, 'Changing', (255, 0, 0)) ]     # red
+
+# the CBU/CNBU/Changing maps drawn along with the grid maps use the colors of the urban maps
+CBU_CNBU_Changing_urbanization_legend = [ (0, 'Background', (0, 0, 0)),        # black
+                                          (65, 'CBU', (255, 140, 0)),          # dark orange
+                                          (130, 'CNBU', (255, 255, 255)),      # white
+                                          (195, 'Changing', (150, 40, 27)) ]   # maroon
+
+# the grid maps have the value 0 for background pixels, and the value of the class (or type) of the grid otherwise
+grid_class_legend = [ (0, 'Background', (0, 0, 0)),       # black
+                      (1, 'Rejected', (255, 255, 255)),   # white
+                      (2, 'C1', (255, 215, 0)),           # yellow
+                      (3, 'C2', (178, 255, 102)),         # light green
+                      (4, 'C3', (0, 204, 0)),             # green
+                      (5, 'C4', (0, 102, 0)),             # dark green
+                      (6, 'C5', (255, 0, 0)) ]            # red
+
+grid_type_legend = [ (0, 'Background', (0, 0, 0)),        # black
+                     (1, 'Rejected', (255, 255, 255)),    # white
+                     (2, 'Urban', (150, 40, 27)),         # maroon
+                     (3, 'PeriUrban', (255, 140, 0)) ]    # dark orange
+
+
+'''
+This function returns the value of each label of a legend by its name
+'''
+def Get_legend_values(legend):
+    return { name: value for value, name, color in legend }
+
+
+'''
+This function returns the lookup table of the colors of a legend, an array of shape (256 x 3) with the RGB color of every label value
+'''
+def Get_color_lookup_table(legend):
+    color_lookup_table = np.zeros((256, 3), dtype=np.uint8)
+    for value, name, color in legend:
+        color_lookup_table[value] = color
+    return color_lookup_table
+
+
+'''
+This function renders a label raster as an RGB image (rows x columns x 3)
+'''
+def Render_RGB_map(label_raster, legend):
+    return Get_color_lookup_table(legend)[ np.asarray(label_raster, dtype=np.uint8) ]
+
+
+'''
+This function renders a label raster as a palettized ("P" mode) image with the colors of the legend
+'''
+def Render_palette_map(label_raster, legend):
+    # the values which are not in the legend are set to 0 (black), as they are beyond the colors stored in the palette
+    legend_value_lookup_table = np.zeros(256, dtype=np.uint8)
+    for value, name, color in legend:
+        legend_value_lookup_table[value] = value
+    palette_map = Image.fromarray( legend_value_lookup_table[ np.asarray(label_raster, dtype=np.uint8) ] )
+    # only the colors up to the largest label value of the legend are stored in the palette
+    largest_value = max(value for value, name, color in legend)
+    palette_map.putpalette( Get_color_lookup_table(legend)[:largest_value+1].flatten().tolist() )
+    return palette_map
+
+
+'''
+This function renders a label raster with the colors of a legend and saves it as a png image
+Inputs:
+1) label_raster = 2D array of label values
+2) legend = list of (label value, name, RGB color) of each label
+3) image_filepath = path of the saved image
+4) palette = True saves a palettized image, and False an RGB image
+'''
+def Save_rendered_map(label_raster, legend, image_filepath, palette=True):
+    os.makedirs(os.path.dirname(image_filepath) or '.', exist_ok = True)
+    if palette:
+        rendered_map = Render_palette_map(label_raster, legend)
+    else:
+        rendered_map = Image.fromarray( Render_RGB_map(label_raster, legend) )
+    rendered_map.save(image_filepath)
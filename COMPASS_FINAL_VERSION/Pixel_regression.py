@@ -0,0 +1,63 @@
+import numpy as np
+
+
+'''
+Since all the pixels share the same input variable (the year), the least squares fit has a closed form and there is no need
+to fit a separate regression model for each pixel. The regression of a pixel is found from its sufficient statistics over the years:
+n (number of years), sum of x, sum of x^2, sum of y, sum of x*y, and sum of y^2
+where x is the year and y is the smoothed value of the pixel in that year.
+These statistics are stored for each pixel as a raster of shape (6 x rows x columns), so that the regression can be
+updated with a new year by a single pass over the image of that year, without going over the previous years again.
+'''
+regression_statistics_names = ['n', 'sum_x', 'sum_x2', 'sum_y', 'sum_xy', 'sum_y2']
+
+
+'''
+This function creates the sufficient statistics of the regression with no years added
+'''
+def Create_regression_statistics(image_shape):
+    return np.zeros((len(regression_statistics_names), image_shape[0], image_shape[1]), dtype=np.float64)
+
+
+'''
+This function adds the smoothed image of a year to the sufficient statistics of each pixel in place
+Inputs:
+1) regression_statistics = sufficient statistics of shape (6 x rows x columns)
+2) smoothed_image = smoothed value of each pixel in this year
+3) pixel_mask = boolean image which is True for the pixels that are added (non-background pixels)
+4) year_value = input variable of the regression for this year
+'''
+def Update_regression_statistics(regression_statistics, smoothed_image, pixel_mask, year_value):
+    pixel_weights = pixel_mask.astype(np.float64)
+    weighted_values = pixel_weights * smoothed_image
+    regression_statistics[0] += pixel_weights
+    regression_statistics[1] += year_value * pixel_weights
+    regression_statistics[2] += (year_value**2) * pixel_weights
+    regression_statistics[3] += weighted_values
+    regression_statistics[4] += year_value * weighted_values
+    regression_statistics[5] += weighted_values * smoothed_image
+    return regression_statistics
+
+
+'''
+This function computes the slope, intercept and cost (mean squared error) of the regression of each pixel
+from its sufficient statistics. Pixels with less than 2 years get NaN values.
+'''
+def Get_regression_from_statistics(regression_statistics):
+    n, sum_x, sum_x2, sum_y, sum_xy, sum_y2 = regression_statistics
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # sums of squares about the mean
+        x_variation = sum_x2 - (sum_x * sum_x) / n
+        xy_covariation = sum_xy - (sum_x * sum_y) / n
+        y_variation = sum_y2 - (sum_y * sum_y) / n
+
+        slope = xy_covariation / x_variation
+        intercept = (sum_y - slope * sum_x) / n
+        # the sum of squared residuals of the best fit line is y_variation - slope * xy_covariation
+        cost = np.maximum(y_variation - slope * xy_covariation, 0.0) / n
+
+    insufficient_years = n < 2
+    slope[insufficient_years] = np.nan
+    intercept[insufficient_years] = np.nan
+    cost[insufficient_years] = np.nan
+    return slope, intercept, cost
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+'''
+In tiled execution, an image is processed in fixed-size tiles so that the memory needed does not depend on the size of the image.
+A filter changes the value of a pixel using its neighbours up to the radius of the filter, so each tile is read along with
+a halo of extra pixels around it. The tile is processed over this larger window and only its core is kept.
+With a halo at least as wide as the total radius of the filters, the core of every tile gets exactly the values it would
+get if the whole image was processed at once, so the tiles can be stitched without seams.
+'''
+default_tile_size = 1024
+
+
+'''
+This function divides an image into tiles
+Inputs:
+1) image_shape = (rows, columns) of the image
+2) tile_size = number of rows and columns of the core of each tile. None gives a single tile covering the whole image
+3) halo = number of extra pixels read on each side of the core, or a pair of (rows, columns) halos. The window is cut at the borders of the image
+Output:
+1) tiles = list of (window, core, core_in_window) tuples for each tile, where each of them is a pair of (row, column) slices
+window = pixels read for the tile, core = pixels of the image written by the tile, core_in_window = position of the core inside the window
+'''
+def Get_tiles(image_shape, tile_size=default_tile_size, halo=0):
+    rows, columns = image_shape[0], image_shape[1]
+    if tile_size is None:
+        tile_size = max(rows, columns, 1)
+    row_halo, column_halo = (halo, halo) if np.isscalar(halo) else halo
+
+    tiles = []
+    for row_start in range(0, rows, tile_size):
+        row_stop = min(row_start + tile_size, rows)
+        window_row_start = max(0, row_start - row_halo)
+        window_row_stop = min(rows, row_stop + row_halo)
+        for column_start in range(0, columns, tile_size):
+            column_stop = min(column_start + tile_size, columns)
+            window_column_start = max(0, column_start - column_halo)
+            window_column_stop = min(columns, column_stop + column_halo)
+
+            window = ( slice(window_row_start, window_row_stop), slice(window_column_start, window_column_stop) )
+            core = ( slice(row_start, row_stop), slice(column_start, column_stop) )
+            core_in_window = ( slice(row_start - window_row_start, row_stop - window_row_start),
+                               slice(column_start - window_column_start, column_stop - window_column_start) )
+            tiles.append( (window, core, core_in_window) )
+    return tiles
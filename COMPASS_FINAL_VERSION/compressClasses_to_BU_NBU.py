@@ -2,6 +2,8 @@ from PIL import Image
 import numpy as np
 import pandas as pd
 import os, sys
+from Year_stack_cube import Get_district_geotransform, Create_year_stack_cube, Open_year_stack_cube_for_writing, Get_available_years
+from Parallel_execution import Run_in_parallel
 
 # define color coding used in prediction images
 Background = 0
@@ -12,28 +14,55 @@ Barrenland = 4
 
 
 districts=['Bangalore', 'Chennai', 'Delhi', 'Gurgaon', 'Hyderabad', 'Kolkata', 'Mumbai']
-years = ['2016', '2017', '2018', '2019']
+# number of processes used to convert the years of all districts in parallel. None uses all the cores and 1 converts them one after another
+number_of_workers = None
 
 destination_directory = 'BU_NBU_maps'
-os.makedirs( destination_directory, exist_ok = True )
 
-for district in districts:
-    print (district)
-    for year in years:
-        print(year)
-        image_filename = 'Landcover_Predictions_Using_IndiaSat/'+district+'/'+district+'_prediction_'+year+'.png'
-        image = np.array( Image.open(image_filename) )
-         
-        # keep built-up pixels as it is i.e. BU with color code (1 * 65)
-        image[ image == 3 ] = 65
-        # keep green, water, and barrenland pixels as non-built-up i.e. NBU with color code (2 x 65)
-        image[ image == 1 ] = 130
-        image[ image == 2 ] = 130
-        image[ image == 4 ] = 130
+'''
+This function converts the landcover prediction of a district in a year to its BU/NBU map, saves it as a png image and
+writes it in the slice of the year in the cube of the district. The slices of different years can be written by different processes.
+'''
+def Convert_to_BU_NBU(district, year, year_index):
+    print(district, year)
+    image_filename = 'Landcover_Predictions_Using_IndiaSat/'+district+'/'+district+'_prediction_'+year+'.png'
+    image = np.array( Image.open(image_filename) )
+     
+    # keep built-up pixels as it is i.e. BU with color code (1 * 65)
+    image[ image == 3 ] = 65
+    # keep green, water, and barrenland pixels as non-built-up i.e. NBU with color code (2 x 65)
+    image[ image == 1 ] = 130
+    image[ image == 2 ] = 130
+    image[ image == 4 ] = 130
 
-        os.makedirs( destination_directory+'/'+district, exist_ok = True )
+    os.makedirs( destination_directory+'/'+district, exist_ok = True )
 
-        image = ( Image.fromarray(image) ).convert("L")
-        image.save(destination_directory+'/'+district+'/'+district+'_BU_NBU_'+year+'.png')
+    image = ( Image.fromarray(image) ).convert("L")
+    image.save(destination_directory+'/'+district+'/'+district+'_BU_NBU_'+year+'.png')
 
+    cube = Open_year_stack_cube_for_writing(district)
+    cube[year_index] = np.array(image)
+    cube.flush()
+    del cube
 
+
+'''
+Driver code starts here
+'''
+if __name__ == '__main__':
+    os.makedirs( destination_directory, exist_ok = True )
+
+    conversion_arguments = []
+    for district in districts:
+        # all the years for which the landcover prediction of the district is present are converted
+        years = Get_available_years('Landcover_Predictions_Using_IndiaSat', district, 'prediction')
+        # the BU/NBU maps of all years are also stacked in a memory-mappable cube for the later stages
+        # the cube is created here with the size of the first image, and its slices are filled in by the conversion of each year
+        image_width, image_height = Image.open('Landcover_Predictions_Using_IndiaSat/'+district+'/'+district+'_prediction_'+years[0]+'.png').size
+        geotransform = Get_district_geotransform('district_coordinates.csv', district, (image_height, image_width))
+        cube = Create_year_stack_cube(district, years, (image_height, image_width), geotransform)
+        del cube
+        conversion_arguments += [(district, year, year_index) for year_index, year in enumerate(years)]
+
+    # every year of every district is converted independently
+    Run_in_parallel(Convert_to_BU_NBU, conversion_arguments, number_of_workers)